@@ -0,0 +1,45 @@
+"""
+Integer-cents PnL accounting.
+
+The engines keep every return in whole cents (plain ints, or int64 arrays for the vectorized engine)
+and only turn them into Decimal dollars when results are reported. Rounding matches quantize_decimal:
+ROUND_HALF_UP applied to the exact binary value of the float.
+"""
+import math
+import numpy as np
+from decimal import Decimal, ROUND_HALF_UP
+
+CENT = Decimal('0.01')
+
+
+def to_cents(value) -> int:
+    """Round a dollar float to whole cents (ROUND_HALF_UP on its exact binary value)."""
+    scaled = abs(value) * 100
+    whole = math.floor(scaled)
+    fraction = scaled - whole
+    # Scaling by 100 can nudge a value across the half-cent, so anything close to it is done exactly
+    if abs(fraction - 0.5) <= 1e-9 * max(scaled, 1.0):
+        return int(Decimal(float(value)).quantize(CENT, rounding=ROUND_HALF_UP).scaleb(2))
+    cents = whole + 1 if fraction > 0.5 else whole
+    return cents if value >= 0 else -cents
+
+
+def to_cents_array(values):
+    """Vectorized to_cents, returning an int64 array of the same shape."""
+    values = np.asarray(values, dtype=float)
+    scaled = np.abs(values) * 100
+    cents = np.floor(scaled + 0.5)
+    fraction = scaled - np.floor(scaled)
+    near_half = np.abs(fraction - 0.5) <= 1e-9 * np.maximum(scaled, 1.0)
+    for index in zip(*np.nonzero(near_half)):
+        cents[index] = abs(to_cents(float(values[index])))
+    return (np.sign(values) * cents).astype(np.int64)
+
+
+def cents_to_decimal(cents) -> Decimal:
+    """Whole cents back to a 2dp Decimal, for reporting."""
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def cents_list_to_decimal(cents_history) -> list:
+    return [cents_to_decimal(cents) for cents in cents_history]
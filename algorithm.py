@@ -1,16 +1,8 @@
-from utils.tools import ema_indicator, sma_indicator, bollinger_bands, rsi_indicator, rsi_series, macd_indicator
+import copy
 
-def strictly_increasing(price_history: list, days: int) -> bool:
-    if len(price_history) < days:
-        return False
-    subset = price_history[-days:]
-    return all(earlier < later for earlier, later in zip(subset, subset[1:]))
-
-def strictly_decreasing(price_history: list, days: int) -> bool:
-    if len(price_history) < days:
-        return False
-    subset = price_history[-days:]
-    return all(earlier > later for earlier, later in zip(subset, subset[1:]))
+from price_feed import HistoryRing
+from events import NULL_SINK
+from strategies import strategy_class
 
 # Centralized default configuration
 DEFAULT_CONFIG = {
@@ -19,6 +11,9 @@ DEFAULT_CONFIG = {
         "upper_bound": 100,
     },
     "Fintech Token": {
+        "ema_window": 3,
+        "momentum_days": 5,
+        # Used by the SMACrossover strategy
         "sma_short_days": 7,
         "sma_long_days": 28,
         "difference_threshold": 10,
@@ -27,10 +22,55 @@ DEFAULT_CONFIG = {
         "ema_window": 3,       # number of days to compute the EMA
         "trade_size": 10000,   # incremental trade unit
     },
+    "Goober Eats": {
+        "ema_window": 7,
+        "threshold": 0.0025,
+    },
+    "Thrifted Jeans": {
+        "ema_window": 5,
+    },
+    "Coffee": {
+        "ema_window": 3,
+    },
+    "Red Pens": {
+        "lower_bound": 2.23,
+        "upper_bound": 2.42,
+        "trade_size": 10000,  # Smaller than the limit so that we do not exceed the total budget
+    },
+}
+
+# Strategy (class or registered name, see strategies.py) trading each instrument.
+# Instruments without one are not traded.
+DEFAULT_STRATEGIES = {
+    "Fun Drink": "EMAReversion",
+    "UQ Dollar": "ThresholdReversion",
+    "Goober Eats": "EMAReversion",
+    "Thrifted Jeans": "EMAReversion",
+    "Fintech Token": "EMAMomentum",
+    "Coffee": "EMAReversion",
+    "Red Pens": "ThresholdReversion",
 }
 
+
+def _replaced(history, seen, last):
+    # Whether the history is not a continuation of the one whose first 'seen' prices (ending in 'last') were
+    # consumed: the engine hands over a fresh history when a run is restarted, which may be shorter, or as long
+    # with different prices. Checking the last consumed price keeps this O(1) per call.
+    return len(history) < seen or (seen > 0 and history[seen - 1] != last)
+
+
 class Algorithm:
-    def __init__(self, positions, config: dict = {}):
+    # Same data and config always give the same positions, so optimizers can skip repeat runs
+    deterministic = True
+
+    def __init__(self, positions, config: dict = {}, strategies: dict = None, instruments=None):
+        """
+        Parameters:
+            positions (dict): Current positions.
+            config (dict): Per-instrument parameters, merged over DEFAULT_CONFIG.
+            strategies (dict): Instrument -> strategy (class or registered name), merged over DEFAULT_STRATEGIES.
+            instruments (iterable): Only trade these instruments (e.g. the one a sweep is tuning), all if None.
+        """
         # Actual price history updated during trading; starts empty.
         self.data = {
             "Fintech Token": [],
@@ -80,26 +120,87 @@ class Algorithm:
         self.day = 0  # Current trading day
         self.positions = positions  # Current positions
         self.daily_spending = {}  # Daily spending by instrument
-        self.trades = {}
-        self.config = DEFAULT_CONFIG.copy()
+        self.trades = {}  # Trade ledgers by asset (see trading_classes.TradeLedger)
+        # Event sink, replaced by the engine's when it runs this algorithm
+        self.events = NULL_SINK
+        # Streaming indicators keyed by (instrument, indicator, window), how many actual prices each has seen,
+        # and the last of them (to notice a history that has been replaced)
+        self.indicators = {}
+        self.indicator_ticks = {}
+        self.indicator_last = {}
+        # Ring buffers of preloaded and actual prices for get_recent_history, how many actual prices each has seen,
+        # and the last of them
+        self.histories = {}
+        self.history_ticks = {}
+        self.history_last = {}
+        # Copied per instance, so one instance's config never changes the defaults (or another instance)
+        self.config = copy.deepcopy(DEFAULT_CONFIG)
         for key, params in config.items():
             if key in self.config and isinstance(params, dict):
                 self.config[key].update(params)
             else:
                 self.config[key] = params
-
-    def get_recent_history(self, instrument: str, days: int) -> list:
+        # One strategy object per traded instrument, built once
+        selected = dict(DEFAULT_STRATEGIES, **(strategies or {}))
+        if instruments is not None:
+            selected = {instrument: selected[instrument] for instrument in instruments if instrument in selected}
+        self.strategies = [strategy_class(strategy)(self, instrument, self.config.setdefault(instrument, {}))
+                           for instrument, strategy in selected.items()]
+        # Number of prices of each strategy's inputs when it was last evaluated
+        self.strategy_ticks = {}
+
+    def get_recent_history(self, instrument: str, days: int):
         """
-        Returns the most recent 'days' worth of data for the instrument.
+        Returns the most recent 'days' worth of data for the instrument, as a read-only array view.
         If actual data is insufficient, it pads the result with preloaded data.
+        The view is only valid until the next day's prices arrive.
         """
-        actual = self.data.get(instrument, [])
-        if len(actual) >= days:
-            return actual[-days:]
-        else:
-            needed = days - len(actual)
-            preload = self.preload_data.get(instrument, [])
-            return preload[-needed:] + actual
+        history = self.data.get(instrument, [])
+        ring = self.histories.get(instrument)
+        if ring is None or days > ring.capacity or \
+                _replaced(history, self.history_ticks[instrument], self.history_last[instrument]):
+            # First use, a longer window than it was sized for, or the history has been restarted
+            ring = HistoryRing(max(self.history_capacity(instrument), days))
+            ring.extend(self.preload_data.get(instrument, []))
+            self.histories[instrument] = ring
+            self.history_ticks[instrument] = 0
+            self.history_last[instrument] = None
+        seen = self.history_ticks[instrument]
+        if len(history) > seen:
+            ring.extend(history[seen:])
+            self.history_ticks[instrument] = len(history)
+            self.history_last[instrument] = history[-1]
+        return ring.last(days)
+
+    def history_capacity(self, instrument: str) -> int:
+        """Longest window any strategy reading the instrument declares, or the instrument's preload length."""
+        windows = [window for strategy in self.strategies if instrument in strategy.inputs
+                   for window in strategy.windows]
+        return max([len(self.preload_data.get(instrument, [])), 1] + windows)
+
+    def get_streaming_indicator(self, instrument, indicator_class, window, **kwargs):
+        """
+        Returns the instrument's streaming indicator (e.g. RollingEMA), fed with any prices it has not seen yet.
+        It is seeded with the preloaded data, so its value matches the batch indicator on get_recent_history().
+        """
+        key = (instrument, indicator_class.__name__, window, tuple(sorted(kwargs.items())))
+        history = self.data.get(instrument, [])
+        indicator = self.indicators.get(key)
+        if indicator is None or _replaced(history, self.indicator_ticks[key], self.indicator_last[key]):
+            # First use, or the history has been restarted
+            indicator = indicator_class(window, **kwargs)
+            for price in self.preload_data.get(instrument, [])[-window:]:
+                indicator.update(price)
+            self.indicators[key] = indicator
+            self.indicator_ticks[key] = 0
+            self.indicator_last[key] = None
+        seen = self.indicator_ticks[key]
+        if len(history) > seen:
+            for price in history[seen:]:
+                indicator.update(price)
+            self.indicator_ticks[key] = len(history)
+            self.indicator_last[key] = history[-1]
+        return indicator
 
     def get_current_price(self, instrument):
         # Use the most recent actual price if available; otherwise, fall back to preloaded data.
@@ -108,150 +209,40 @@ class Algorithm:
         else:
             return self.preload_data[instrument][-1]
 
+    def strategy_due(self, strategy) -> bool:
+        """Whether any of the strategy's inputs has a new price since it was last evaluated, or it is due today."""
+        ticks = tuple(len(self.data.get(instrument, ())) for instrument in strategy.inputs)
+        changed = ticks != self.strategy_ticks.get(strategy)
+        scheduled = strategy.every is not None and self.day % strategy.every == 0
+        if not (changed or scheduled):
+            return False
+        self.strategy_ticks[strategy] = ticks
+        return True
+
     def get_positions(self):
-        total_budget = 500_000  # Maximum absolute value of positions allowed per day
         current_positions = self.positions
         position_limits = self.position_limits
 
         # Initialise desired positions for all instruments.
         desired_positions = {instr: 0 for instr in position_limits}
 
-        # Trading function for UQ Dollar (no indicator needed)
-        def trade_uq_dollar():
-            asset = "UQ Dollar"
-            current_price = self.get_current_price(asset)
-            if current_price < 100:
-                desired_positions[asset] = position_limits[asset]
-            elif current_price > 100:
-                desired_positions[asset] = -position_limits[asset]
-            else:
-                desired_positions[asset] = current_positions.get(asset, 0)
-
-        # Trading function for Fintech Token using SMA indicators (with padded data)
-        def trade_fintech_token():
-            asset = "Fintech Token"
-            params = self.config["Fintech Token"]
-            padded_short = self.get_recent_history(asset, params["sma_short_days"])
-            padded_long = self.get_recent_history(asset, params["sma_long_days"])
-            sma_short = sma_indicator(padded_short, params["sma_short_days"])
-            sma_long = sma_indicator(padded_long, params["sma_long_days"])
-            difference = abs(sma_short - sma_long)
-            if self.day > 2:
-                if sma_short > sma_long and difference > params["difference_threshold"]:
-                    desired_positions[asset] = position_limits[asset]
-                elif sma_short < sma_long and difference > params["difference_threshold"]:
-                    desired_positions[asset] = -position_limits[asset]
-                else:
-                    desired_positions[asset] = position_limits[asset]
-
-        # Trading function for Fun Drink using EMA with padded data.
-        def trade_fun_drink():
-            asset = "Fun Drink"
-            current_price = self.get_current_price(asset)
-            current_position = current_positions.get(asset, 0)
-            params = self.config["Fun Drink"]
-            ema_window = params["ema_window"]
-            padded_history = self.get_recent_history(asset, ema_window)
-            ema = ema_indicator(padded_history, ema_window)
-            if current_price < ema:
-                desired_positions[asset] = position_limits[asset]
-            elif current_price > ema:
-                desired_positions[asset] = -position_limits[asset]
-            else:
-                desired_positions[asset] = current_position
-
-        # Trading function for Goober Eats using EMA with padded data.
-        def trade_goober_eats():
-            asset = "Goober Eats"
-            current_price = self.get_current_price(asset)
-            current_position = current_positions.get(asset, 0)
-            ema_window = 7
-            padded_history = self.get_recent_history(asset, ema_window)
-            ema = ema_indicator(padded_history, ema_window)
-            threshold = 0.0025
-            if current_price < ema - threshold:
-                desired_positions[asset] = position_limits[asset]
-            elif current_price > ema + threshold:
-                desired_positions[asset] = -position_limits[asset]
-            else:
-                desired_positions[asset] = current_position
-
-        # Trading function for Thrifted Jeans using EMA with padded data.
-        def trade_thrifted_jeans():
-            asset = "Thrifted Jeans"
-            current_price = self.get_current_price(asset)
-            current_position = current_positions.get(asset, 0)
-            ema_window = 5
-            padded_history = self.get_recent_history(asset, ema_window)
-            ema = ema_indicator(padded_history, ema_window)
-            if current_price < ema:
-                desired_positions[asset] = position_limits[asset]
-            elif current_price > ema:
-                desired_positions[asset] = -position_limits[asset]
-            else:
-                desired_positions[asset] = current_position
-
-        # Trading function for Coffee using EMA with padded data.
-        def trade_coffee_simple():
-            asset = "Coffee"
-            current_price = self.get_current_price(asset)
-            current_position = current_positions.get(asset, 0)
-            ema_window = 3
-            padded_history = self.get_recent_history(asset, ema_window)
-            ema = ema_indicator(padded_history, ema_window)
-            if current_price < ema:
-                desired_positions[asset] = position_limits[asset]
-            elif current_price > ema:
-                desired_positions[asset] = -position_limits[asset]
-            else:
-                desired_positions[asset] = current_position
-
-        # Trading function for Fintech Token using EMA and momentum.
-        def trade_fintech_token_simple():
-            asset = "Fintech Token"
-            current_price = self.get_current_price(asset)
-            current_position = current_positions.get(asset, 0)
-            ema_window = 3
-            padded_history = self.get_recent_history(asset, ema_window)
-            ema = ema_indicator(padded_history, ema_window)
-            desired_position = current_position
-            if current_price < ema:
-                desired_position = position_limits[asset]
-            elif current_price > ema:
-                desired_position = -position_limits[asset]
-            # Use actual (unpadded) data for momentum check.
-            if strictly_increasing(self.data[asset], 5):
-                desired_position = position_limits[asset]
-            elif strictly_decreasing(self.data[asset], 5):
-                desired_position = -position_limits[asset]
-            desired_positions[asset] = desired_position
-
-        # Trading function for Red Pens (uses simple thresholds; no indicator padding needed).
-        def trade_red_pens_simple():
-            asset = "Red Pens"
-            current_price = self.get_current_price(asset)
-            current_position = current_positions.get(asset, 0)
-            trade_size = 10000  # Smaller than the limit so that we do not exceed the total budget
-            if current_price < 2.23:
-                desired_positions[asset] = trade_size
-            elif current_price > 2.42:
-                desired_positions[asset] = -trade_size
+        # Each strategy sets its own instrument's position, holding it when not evaluated
+        for strategy in self.strategies:
+            instrument = strategy.instrument
+            if instrument not in position_limits:
+                # Not in the engine's universe
+                continue
+            current_position = current_positions.get(instrument, 0)
+            if self.strategy_due(strategy):
+                desired_positions[instrument] = strategy.position(current_position, position_limits[instrument])
             else:
-                desired_positions[asset] = current_position
-
-        # Execute trading functions in sequence.
-        trade_fun_drink()
-        trade_uq_dollar()
-        trade_goober_eats()
-        trade_thrifted_jeans()
-        trade_fintech_token_simple()
-        trade_coffee_simple()
-        trade_red_pens_simple()
-
+                desired_positions[instrument] = current_position
 
         # Update daily spending as the total absolute value of desired positions.
         total_spending = 0
         for instr in self.instruments:
+            if instr not in desired_positions:
+                continue
             total_spending += abs(desired_positions[instr] * self.get_current_price(instr))
         self.daily_spending[self.day] = total_spending
 
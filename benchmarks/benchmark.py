@@ -0,0 +1,274 @@
+"""
+Benchmarks for the backtest hot path.
+
+Generates synthetic price histories (any number of days and instruments; past the nine real instruments
+they are named "Synthetic 00001" etc. and given their own universe config) and times engine construction,
+the per-day run_algorithms loop, the indicators and a short optimizer run. Results are written as JSON so runs can be compared, e.g.
+
+    python benchmarks/benchmark.py --days 365 10000 100000 --output bench.json
+    python benchmarks/benchmark.py --days 365 10000 100000 --compare bench.json
+    python benchmarks/benchmark.py --days 365 --instruments 5000 --bundle --optimizer-days 0
+
+--compare exits with status 1 if any benchmark got slower than --max-slowdown times its baseline.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'optimization'))
+
+from algorithm import Algorithm
+from market_data import PRICE_FILE_SUFFIX, write_bundle
+from simulation import TradingEngine, positionLimits, totalDailyBudget
+from universe import write_universe_config
+from utils import indicators
+from utils.tools import ema_indicator, sma_indicator, rsi_series, bollinger_bands, RollingEMA
+
+
+def write_synthetic_data(folder, days, instruments, seed=0):
+    """
+    Write mean-reverting random walk price histories (Day,Price CSVs) and a universe config to folder.
+
+    The real instruments come first, starting from the algorithm's last preloaded prices. Any beyond them
+    are synthetic, start at a random price and have a limit of 100 units. The daily budget grows with the
+    number of instruments.
+
+    Returns:
+        tuple: (instrument names, universe config path)
+    """
+    from scipy.signal import lfilter
+    rng = np.random.default_rng(seed)
+    preloaded = Algorithm(positions={}).preload_data
+    names = list(positionLimits)[:instruments]
+    means = [preloaded[name][-1] for name in names]
+    limits = {name: positionLimits[name] for name in names}
+    for number in range(1, instruments - len(names) + 1):
+        name = f'Synthetic {number:05d}'
+        names.append(name)
+        means.append(rng.uniform(5, 500))
+        limits[name] = 100
+    means = np.array(means)[:, None]
+    # AR(1) deviation from each mean: x[t] = 0.95 * x[t - 1] + shock[t]
+    shocks = rng.normal(0, 0.01, (len(names), days)) * means
+    prices = means + lfilter([1.0], [1.0, -0.95], shocks, axis=-1)
+    prices = np.maximum(np.round(prices, 2), 0.01)
+    for name, history in zip(names, prices):
+        with open(os.path.join(folder, name + PRICE_FILE_SUFFIX), 'w') as file:
+            file.write('Day,Price\n')
+            file.writelines(f'{day},{price}\n' for day, price in enumerate(history.tolist()))
+    configPath = os.path.join(folder, 'universe.json')
+    write_universe_config(configPath, limits, totalDailyBudget * max(1, instruments // len(positionLimits)))
+    return names, configPath
+
+
+class ArrayMomentum:
+    # Minimal array-interface algorithm: long if up over the last 5 days, short if down, a tenth of the limit
+    array_interface = True
+
+    def __init__(self, positions):
+        self.positions = positions
+
+    def get_positions(self):
+        if self.day < 5:
+            return np.zeros(len(self.position_limits), dtype=np.int64)
+        return np.sign(self.data[-1] - self.data[-5]).astype(np.int64) * (self.position_limits // 10)
+
+
+def timed(func, repeat=1):
+    # Best wall time of `repeat` calls, and the last call's result
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_engine(folder, config, names, days, repeat):
+    from market_data import clear_cache
+    results = []
+
+    def engine():
+        return TradingEngine(dataFolder=folder, universeConfig=config)
+
+    def cold():
+        clear_cache()
+        return engine()
+    seconds, _ = timed(cold, repeat)
+    results.append({'benchmark': 'engine_construction_cold', 'seconds': seconds})
+    seconds, _ = timed(engine, max(repeat, 10))
+    results.append({'benchmark': 'engine_construction_warm', 'seconds': seconds})
+
+    # The default algorithm only trades the real instruments in the universe
+    def default_algorithm(positions):
+        return Algorithm(positions=positions, instruments=names)
+
+    for name, algo_class in [('run_algorithms', default_algorithm), ('run_algorithms_array', ArrayMomentum)]:
+        def run():
+            simulation = engine()
+            with contextlib.redirect_stdout(io.StringIO()):
+                simulation.run_algorithms(algo_class(positions=simulation.positions), output_daily_to_CLI=False)
+        seconds, _ = timed(run, repeat)
+        results.append({'benchmark': name, 'seconds': seconds, 'per_day_us': seconds / days * 1e6})
+
+    def positions_only():
+        # Algorithm.get_positions on its own, with the engine's bookkeeping taken out
+        engine = TradingEngine(dataFolder=folder, universeConfig=config)
+        feeds = engine.create_price_feeds()
+        algo = default_algorithm(engine.positions)
+        algo.data = feeds
+        algo.position_limits = engine.positionLimits
+        for day in range(days):
+            for feed in feeds.values():
+                feed.advance()
+            algo.day = day
+            algo.get_positions()
+    seconds, _ = timed(positions_only, repeat)
+    results.append({'benchmark': 'get_positions', 'seconds': seconds, 'per_day_us': seconds / days * 1e6})
+    return results
+
+
+def bench_indicators(prices, repeat, window=28):
+    results = []
+    history = prices.tolist()
+    calls = min(len(history), 10000)
+    batch = {
+        'sma_indicator': lambda h: sma_indicator(h, window),
+        'ema_indicator': lambda h: ema_indicator(h, window),
+        'bollinger_bands': lambda h: bollinger_bands(h, window),
+        'rsi_series_last_window': lambda h: rsi_series(h[-(window + 1):], window),
+    }
+    for name, func in batch.items():
+        # Called on a growing history, the way the algorithm calls them each day
+        seconds, _ = timed(lambda: [func(history[:day + 1]) for day in range(window + 1, calls)], repeat)
+        results.append({'benchmark': f'tools.{name}', 'seconds': seconds,
+                        'per_call_us': seconds / max(calls - window - 1, 1) * 1e6})
+
+    def streaming():
+        ema = RollingEMA(window)
+        for price in history[:calls]:
+            ema.update(price)
+            ema.value
+    seconds, _ = timed(streaming, repeat)
+    results.append({'benchmark': 'tools.RollingEMA', 'seconds': seconds, 'per_call_us': seconds / calls * 1e6})
+
+    series = {
+        'sma': lambda: indicators.sma(prices, window),
+        'ema': lambda: indicators.ema(prices, window),
+        'rsi': lambda: indicators.rsi(prices, 14),
+        'macd': lambda: indicators.macd(prices),
+        'bollinger_bands': lambda: indicators.bollinger_bands(prices, window),
+    }
+    for name, func in series.items():
+        seconds, _ = timed(func, repeat)
+        results.append({'benchmark': f'indicators.{name}', 'seconds': seconds})
+    return results
+
+
+def bench_optimizer(folder, workers):
+    from optimizer import optimize_instrument_params, int_round
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return optimize_instrument_params(
+                instrument="Fun Drink", param_names=["ema_window"], bounds=[(2, 40)],
+                conversion_funcs=[int_round], algo_class=Algorithm, simulation_engine_class=TradingEngine,
+                n_runs=1, workers=workers, seed=0, dataFolder=folder, popsize=5, maxiter=2
+            )
+    seconds, _ = timed(run)
+    return [{'benchmark': 'optimizer_short_run', 'seconds': seconds, 'workers': workers}]
+
+
+def compare(results, baseline_path, max_slowdown):
+    # Returns the benchmarks that are more than max_slowdown times slower than in the baseline
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+
+    def key(entry):
+        return entry['benchmark'], entry['days'], entry['instruments']
+    before = {key(entry): entry['seconds'] for entry in baseline['results']}
+    regressions = []
+    for entry in results:
+        previous = before.get(key(entry))
+        if previous and entry['seconds'] > previous * max_slowdown:
+            regressions.append({**entry, 'baseline_seconds': previous, 'slowdown': entry['seconds'] / previous})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, nargs='+', default=[365, 10000], help='history lengths to benchmark')
+    parser.add_argument('--instruments', type=int, default=len(positionLimits), help='number of instruments')
+    parser.add_argument('--repeat', type=int, default=3, help='repeats per benchmark (best time is kept)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--optimizer-days', type=int, default=365,
+                        help='history length for the short optimizer run (0 to skip it)')
+    parser.add_argument('--workers', type=int, default=1, help='optimizer worker processes')
+    parser.add_argument('--bundle', action='store_true',
+                        help='convert the synthetic CSV files to a memory-mapped bundle before timing')
+    parser.add_argument('--output', help='write the JSON results here (default: stdout)')
+    parser.add_argument('--compare', help='baseline JSON results to check for regressions')
+    parser.add_argument('--max-slowdown', type=float, default=1.25)
+    args = parser.parse_args()
+    if args.instruments < 1:
+        parser.error('--instruments must be at least 1')
+    if args.optimizer_days and 'Fun Drink' not in list(positionLimits)[:args.instruments]:
+        parser.error('the optimizer run tunes Fun Drink, which needs --instruments of at least '
+                     f"{list(positionLimits).index('Fun Drink') + 1} (or --optimizer-days 0)")
+
+    results = []
+    lengths = sorted(set(args.days + ([args.optimizer_days] if args.optimizer_days else [])))
+    for days in lengths:
+        with tempfile.TemporaryDirectory() as folder:
+            names, config = write_synthetic_data(folder, days, args.instruments, args.seed)
+            if args.bundle:
+                write_bundle(folder)
+            entries = []
+            if days in args.days:
+                entries += bench_engine(folder, config, names, days, args.repeat)
+                prices = TradingEngine(dataFolder=folder, universeConfig=config).prices[names[0]]
+                entries += bench_indicators(prices, args.repeat)
+            if days == args.optimizer_days:
+                entries += bench_optimizer(folder, args.workers)
+            for entry in entries:
+                results.append({'days': days, 'instruments': args.instruments, **entry})
+                print(f"{entry['benchmark']:<36} days={days:<8} {entry['seconds']:.6f}s", file=sys.stderr)
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'args': vars(args),
+        },
+        'results': results,
+    }
+    regressions = compare(results, args.compare, args.max_slowdown) if args.compare else []
+    report['regressions'] = regressions
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output)
+    else:
+        print(output)
+    for regression in regressions:
+        print(f"REGRESSION {regression['benchmark']} days={regression['days']}: "
+              f"{regression['slowdown']:.2f}x slower", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
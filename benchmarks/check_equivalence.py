@@ -0,0 +1,104 @@
+"""
+Checks that two of the hot path rewrites still behave exactly like the code they replaced.
+
+    get_recent_history   the ring buffers of Algorithm.get_recent_history against the original list slicing
+                         (actual prices, padded with preloaded ones), over random preload lengths, windows
+                         longer than the buffers, and histories that restart
+    to_cents             the integer-cents accounting (to_cents and to_cents_array) against the original
+                         quantize_decimal rounding of each day's PnL, including values on the half cent
+
+Both are fuzzed from a seed, so a failure can be reproduced:
+
+    python benchmarks/check_equivalence.py --trials 2000 --seed 0
+
+Exits with status 1 (listing the first mismatches) if anything differs.
+"""
+import argparse
+import os
+import sys
+from decimal import Decimal
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from accounting import to_cents, to_cents_array
+from algorithm import Algorithm
+from simulation import quantize_decimal
+
+
+def baseline_recent_history(actual, preload, days):
+    # The original Algorithm.get_recent_history (days >= 1)
+    if len(actual) >= days:
+        return actual[-days:]
+    needed = days - len(actual)
+    return preload[-needed:] + actual
+
+
+def baseline_cents(value):
+    # The original per-instrument PnL rounding, in cents
+    return int(quantize_decimal(value, 2) * 100)
+
+
+def check_recent_history(trials, rng):
+    mismatches = []
+    instrument = "Fun Drink"
+    for trial in range(trials):
+        algo = Algorithm(positions={})
+        preload = [round(float(price), 2) for price in rng.uniform(5, 10, rng.integers(0, 40))]
+        algo.preload_data[instrument] = preload
+        actual = []
+        algo.data = {instrument: actual}
+        for step in range(int(rng.integers(1, 80))):
+            if rng.random() < 0.05:
+                # The engine hands the algorithm a fresh history (shorter, or re-grown to the same length), e.g. a new run
+                actual = actual[:int(rng.integers(0, len(actual) + 1))]
+                algo.data = {instrument: actual}
+            actual.append(round(float(rng.uniform(5, 10)), 2))
+            for days in rng.integers(1, 70, 3).tolist():
+                got = algo.get_recent_history(instrument, days).tolist()
+                expected = baseline_recent_history(actual, preload, days)
+                if got != expected:
+                    mismatches.append(f"trial {trial}, step {step}, days {days}: {got} != {expected}")
+    return mismatches
+
+
+def check_cents(trials, rng):
+    positions = rng.integers(-75000, 75001, trials)
+    # Two decimal place prices and moves, like the data
+    moves = rng.integers(-20000, 20001, trials) / 100
+    values = [float(position * move) for position, move in zip(positions, moves)]
+    values += [float(position * (price - previous)) for position, price, previous in
+               zip(positions, rng.integers(100, 200000, trials) / 100, rng.integers(100, 200000, trials) / 100)]
+    # Values on (or one float step either side of) the half cent
+    halves = [float(Decimal(int(cents)) / 100 + Decimal('0.005')) for cents in rng.integers(-10 ** 8, 10 ** 8, trials)]
+    values += halves + [float(np.nextafter(value, np.inf)) for value in halves] \
+        + [float(np.nextafter(value, -np.inf)) for value in halves]
+    mismatches = []
+    vectorized = to_cents_array(values).tolist()
+    for value, cents in zip(values, vectorized):
+        expected = baseline_cents(value)
+        if to_cents(value) != expected or cents != expected:
+            mismatches.append(f"{value!r}: to_cents {to_cents(value)}, to_cents_array {cents}, expected {expected}")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trials', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    failed = False
+    for name, check in (("get_recent_history", check_recent_history), ("to_cents", check_cents)):
+        mismatches = check(args.trials, np.random.default_rng(args.seed))
+        print(f"{name}: {'ok' if not mismatches else f'{len(mismatches)} mismatches'}")
+        for mismatch in mismatches[:5]:
+            print(f"  {mismatch}")
+        failed = failed or bool(mismatches)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
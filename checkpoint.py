@@ -0,0 +1,86 @@
+"""
+Snapshots of a TradingEngine run part way through.
+
+A Checkpoint holds everything needed to carry a run on from the day it was taken: the filled days of the
+engine's state arrays, its positions and total PnL, and a copy of the algorithm with its internal state
+(trades, streaming indicators, strategies such as UQDollarStrategy.active_trade, ...). The price history
+and event sink the engine hands the algorithm are left out, as the engine sets them again when resuming.
+
+Checkpoints can be pickled to a file, and restored any number of times, so runs that share a prefix
+(optimizer candidates, what-if changes to an algorithm) only simulate the days after it:
+
+    engine.run_algorithms(algo, output_daily_to_CLI=False, untilDay=200)
+    checkpoint = engine.checkpoint()
+    branch = engine.branch(checkpoint)          # a new engine, on day 200 with its own copy of algo
+    branch.activeRun.algorithms[0].config["Fun Drink"]["ema_window"] = 5
+    branch.resume_run()
+"""
+import copy
+import pickle
+
+# Attributes the engine sets on an algorithm each day or run, which are not part of its own state
+ENGINE_ATTRIBUTES = ('data', 'events')
+
+# Engine state arrays with a row per day
+DAY_ARRAYS = ('positionMatrix', 'returnsCentsMatrix', 'cumulativeReturnsCentsMatrix', 'pcPositionMatrix',
+              'totalReturnCentsArray', 'totalValueCentsArray', 'budgetUsedArray')
+
+
+def copy_algorithm(algorithm):
+    """Deep copy of an algorithm, without the attributes the engine sets on it."""
+    detached = {name: algorithm.__dict__.pop(name) for name in ENGINE_ATTRIBUTES if name in algorithm.__dict__}
+    try:
+        return copy.deepcopy(algorithm)
+    finally:
+        algorithm.__dict__.update(detached)
+
+
+class Checkpoint:
+    def __init__(self, day, arrays, positions, totalPNLCents, validationReports, algorithm, instruments,
+                 totalDays, incrementalFeed=True, output_daily_to_CLI=False):
+        """
+        Parameters:
+            day (int): Days run when the checkpoint was taken (the next day to run).
+            arrays (dict): Name -> the filled rows of each of the engine's DAY_ARRAYS.
+            positions (dict or np.ndarray): The engine's positions.
+            totalPNLCents (int): Total PnL so far.
+            validationReports (list): Reports of the days where positions were zeroed.
+            algorithm: Copy of the algorithm (see copy_algorithm).
+            instruments (list): Universe column order, checked when restoring.
+            totalDays (int): Days of data the run was over, checked when restoring.
+            incrementalFeed (bool): Whether the algorithm was given price feeds or legacy history lists.
+            output_daily_to_CLI (bool): Whether the run printed the daily PnL.
+        """
+        self.day = day
+        self.arrays = arrays
+        self.positions = positions
+        self.totalPNLCents = totalPNLCents
+        self.validationReports = validationReports
+        self.algorithm = algorithm
+        self.instruments = instruments
+        self.totalDays = totalDays
+        self.incrementalFeed = incrementalFeed
+        self.output_daily_to_CLI = output_daily_to_CLI
+
+    def new_algorithm(self):
+        # A fresh copy, so the checkpoint can be restored again
+        return copy.deepcopy(self.algorithm)
+
+    def save(self, path):
+        with open(path, 'wb') as file:
+            pickle.dump(self, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def __repr__(self):
+        return f"Checkpoint(day={self.day}, totalPNLCents={self.totalPNLCents})"
+
+
+def load_checkpoint(path):
+    """
+    Load a Checkpoint saved with Checkpoint.save. Only load files you trust, as they are pickles
+    (the algorithm's class must also be importable).
+    """
+    with open(path, 'rb') as file:
+        checkpoint = pickle.load(file)
+    if not isinstance(checkpoint, Checkpoint):
+        raise TypeError(f"{path} does not hold a Checkpoint.")
+    return checkpoint
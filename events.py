@@ -0,0 +1,278 @@
+"""
+Typed events emitted by the engines and strategies, and the sinks that receive them.
+
+Instead of printing as they go, the engines and trading classes hand events to a sink. A sink has a
+level, and callers check sink.enabled(level) before building an event, so with a NullSink (or a sink
+whose level is above the event's) an event costs one method call and nothing is formatted or written.
+
+    NullSink()                      drops everything
+    ConsoleSink(level=WARNING)      prints each event's message (the default for engines)
+    RingBufferSink(capacity, level) keeps the last `capacity` events in memory
+    JsonlFileSink(path, level)      appends one JSON object per event to a file
+"""
+import json
+from collections import deque
+from logging import DEBUG, INFO, WARNING, ERROR
+
+
+class Event:
+    # Name of the event in serialized form, and the level it is emitted at
+    kind = 'event'
+    level = INFO
+
+    def __init__(self, day=None):
+        self.day = day
+
+    def fields(self):
+        """The event's data as JSON-serializable values."""
+        return {'day': self.day}
+
+    def message(self):
+        return f"Day {self.day}: {self.kind}"
+
+    def to_dict(self):
+        return {'kind': self.kind, 'level': self.level, **self.fields()}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.fields()})"
+
+
+class DailyPnL(Event):
+    kind = 'daily_pnl'
+    level = DEBUG
+
+    def __init__(self, day, totalPNLCents):
+        super().__init__(day)
+        self.totalPNLCents = int(totalPNLCents)
+
+    def fields(self):
+        return {'day': self.day, 'totalPNLCents': self.totalPNLCents}
+
+    def message(self):
+        # Imported here so this module stays importable on its own
+        from accounting import cents_to_decimal
+        return f"Total PNL @ Day {self.day}: {cents_to_decimal(self.totalPNLCents)}"
+
+
+class PositionsZeroed(Event):
+    kind = 'positions_zeroed'
+    level = WARNING
+
+    def __init__(self, report, instruments, limits):
+        super().__init__(report.day)
+        self.report = report
+        self.instruments = instruments
+        self.limits = limits
+
+    def fields(self):
+        report = self.report
+        fields = {'day': self.day}
+        if report.day is None:
+            # A whole matrix: which days were over budget and how many positions were invalid
+            fields['overBudget'] = [int(day) for day in report.overBudget.nonzero()[0]]
+            fields['invalidPositions'] = int(report.invalid.sum())
+        else:
+            fields['overBudget'] = bool(report.overBudget)
+            fields['totalValue'] = float(report.totalValue)
+            fields['invalid'] = [self.instruments[column] for column in report.invalid.nonzero()[0]]
+        return fields
+
+    def message(self):
+        return self.report.summary(self.instruments, self.limits)
+
+
+class TradeOpened(Event):
+    kind = 'trade_opened'
+    level = INFO
+
+    def __init__(self, day, asset, price, position):
+        super().__init__(day)
+        self.asset = asset
+        self.price = price
+        self.position = position
+
+    def fields(self):
+        return {'day': self.day, 'asset': self.asset, 'price': self.price, 'position': self.position}
+
+    def message(self):
+        return f"Opened new trade for {self.asset} on day {self.day} at price {self.price}"
+
+
+class TradeClosed(Event):
+    kind = 'trade_closed'
+    level = INFO
+
+    def __init__(self, day, asset, price, realisedValue, evHistory):
+        super().__init__(day)
+        self.asset = asset
+        self.price = price
+        self.realisedValue = realisedValue
+        # The trade's EV path, as an array copied out of its ledger (events are only built when a sink wants them)
+        self.evHistory = evHistory
+
+    def fields(self):
+        return {'day': self.day, 'asset': self.asset, 'price': self.price,
+                'realisedValue': self.realisedValue, 'evHistory': list(self.evHistory)}
+
+    def message(self):
+        return (f"Trade for {self.asset} closed on day {self.day} at price {self.price}, "
+                f"realised value {self.realisedValue} ({len(self.evHistory)} EV records)")
+
+
+class DatasetSkipped(Event):
+    kind = 'dataset_skipped'
+    level = INFO
+
+    def __init__(self, instrument, dataFolder):
+        super().__init__()
+        self.instrument = instrument
+        self.dataFolder = dataFolder
+
+    def fields(self):
+        return {'day': self.day, 'instrument': self.instrument, 'dataFolder': str(self.dataFolder)}
+
+    def message(self):
+        return f"No position limit set for {self.instrument}. This dataset will not be loaded."
+
+
+class StaleBundle(Event):
+    kind = 'stale_bundle'
+    level = WARNING
+
+    def __init__(self, dataFolder):
+        super().__init__()
+        self.dataFolder = dataFolder
+
+    def fields(self):
+        return {'day': self.day, 'dataFolder': str(self.dataFolder)}
+
+    def message(self):
+        return f"The bundle in {self.dataFolder} is older than its CSV files, loading the CSV files instead."
+
+
+class DatasetLengthMismatch(Event):
+    kind = 'dataset_length_mismatch'
+    level = ERROR
+
+    def __init__(self, dataFolder, lengths):
+        super().__init__()
+        self.dataFolder = dataFolder
+        # Instrument -> number of days in its dataset
+        self.lengths = dict(lengths)
+
+    def fields(self):
+        return {'day': self.day, 'dataFolder': str(self.dataFolder), 'lengths': self.lengths}
+
+    def message(self):
+        return f"Error, not all datasets in {self.dataFolder} are the same length: " + \
+            ', '.join(f"{instrument} has {days} days" for instrument, days in self.lengths.items())
+
+
+class TradeEV(Event):
+    kind = 'trade_ev'
+    level = DEBUG
+
+    def __init__(self, day, asset, tradeType, ev, price):
+        super().__init__(day)
+        self.asset = asset
+        self.tradeType = tradeType
+        self.ev = ev
+        self.price = price
+
+    def fields(self):
+        return {'day': self.day, 'asset': self.asset, 'tradeType': self.tradeType, 'ev': self.ev,
+                'price': self.price}
+
+    def message(self):
+        return f"Day {self.day} - {self.tradeType} Trade EV for {self.asset}: {self.ev} at price {self.price}"
+
+
+class EventSink:
+    def __init__(self, level=INFO):
+        """
+        Parameters:
+            level (int): Events below this level (logging's DEBUG, INFO, WARNING, ERROR) are dropped.
+        """
+        self.level = level
+
+    def enabled(self, level):
+        """Whether an event at `level` would be kept. Check this before building the event."""
+        return level >= self.level
+
+    def emit(self, event):
+        if event.level >= self.level:
+            self.write(event)
+
+    def write(self, event):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class NullSink(EventSink):
+    def __init__(self):
+        super().__init__(level=float('inf'))
+
+    def enabled(self, level):
+        return False
+
+    def emit(self, event):
+        pass
+
+
+class ConsoleSink(EventSink):
+    def __init__(self, level=WARNING):
+        super().__init__(level)
+
+    def write(self, event):
+        print(event.message())
+
+
+class RingBufferSink(EventSink):
+    def __init__(self, capacity=10_000, level=DEBUG):
+        super().__init__(level)
+        self.events = deque(maxlen=capacity)
+
+    def write(self, event):
+        self.events.append(event)
+
+    def of_kind(self, kind):
+        return [event for event in self.events if event.kind == kind]
+
+    def __len__(self):
+        return len(self.events)
+
+    def __iter__(self):
+        return iter(self.events)
+
+
+class JsonlFileSink(EventSink):
+    def __init__(self, path, level=INFO, append=False):
+        super().__init__(level)
+        self.path = path
+        self.file = open(path, 'a' if append else 'w')
+
+    def write(self, event):
+        self.file.write(json.dumps(event.to_dict(), default=_to_json) + '\n')
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+def _to_json(value):
+    # NumPy scalars and arrays, and Decimals, that events may carry
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+# Shared sink for anything that should stay silent (e.g. optimizer backtests)
+NULL_SINK = NullSink()
@@ -0,0 +1,246 @@
+"""
+Process-wide store of parsed price histories.
+
+Every TradingEngine used to read and parse all of the CSV files when it was created, which the optimizers do
+thousands of times. load_market_data parses a data folder once per process and hands the same MarketData
+back while the files are unchanged (checked by file modification times and sizes). Prices are held as
+contiguous, read-only float64 arrays, so every engine can share them without copying.
+
+A data folder can also hold a binary bundle (see write_bundle): a manifest plus one (days x instruments)
+column-major .npy file, so each instrument's prices are one contiguous column. The bundle is memory-mapped
+rather than parsed, so loading it is close to free and processes using the same bundle share its pages.
+Convert a folder of CSV files with
+
+    python market_data.py ./data/seen_data
+"""
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+
+from events import NULL_SINK, DatasetLengthMismatch, DatasetSkipped, StaleBundle, INFO, WARNING, ERROR
+
+PRICE_FILE_SUFFIX = '_price_history.csv'
+BUNDLE_MANIFEST = 'manifest.json'
+BUNDLE_FORMAT = 1
+
+# data folder -> (file fingerprint, MarketData)
+_cache = {}
+
+
+class MarketData:
+    def __init__(self, prices, dataFolder=None, matrix=None):
+        """
+        Parameters:
+            prices (dict): Instrument name -> price history (all the same length).
+            dataFolder (str): Where the data was loaded from, if anywhere.
+            matrix (np.ndarray): (days x instruments) prices with columns in `prices` order, if already built.
+        """
+        self.dataFolder = dataFolder
+        # First day of the full history these prices start at, and the prices before it (for a window)
+        self.start = 0
+        self.warmup = {}
+        self._matrix = matrix
+        self.prices = {}
+        for instrument, history in prices.items():
+            array = np.ascontiguousarray(history, dtype=np.float64)
+            array.flags.writeable = False
+            self.prices[instrument] = array
+        self.instruments = list(self.prices.keys())
+        self.totalDays = len(self.prices[self.instruments[0]]) if self.instruments else 0
+        self._frames = None
+        # (start, stop) -> MarketData of those days, see window()
+        self._windows = {}
+
+    @classmethod
+    def from_frames(cls, frames, dataFolder=None):
+        # Build from already loaded (Day, Price) DataFrames
+        return cls({instrument: frame['Price'].to_numpy(dtype=float) for instrument, frame in frames.items()},
+                   dataFolder=dataFolder)
+
+    @property
+    def frames(self):
+        # (Day, Price) DataFrames as read from the CSV files, only built if something asks for them
+        if self._frames is None:
+            self._frames = {
+                instrument: pd.DataFrame({'Day': np.arange(len(prices)), 'Price': prices})
+                for instrument, prices in self.prices.items()
+            }
+        return self._frames
+
+    @property
+    def matrix(self):
+        # (days x instruments) read-only price matrix, columns in self.instruments order
+        if self._matrix is None:
+            matrix = np.empty((self.totalDays, len(self.instruments)), order='F')
+            for column, instrument in enumerate(self.instruments):
+                matrix[:, column] = self.prices[instrument]
+            matrix.flags.writeable = False
+            self._matrix = matrix
+        return self._matrix
+
+
+    def window(self, start, stop):
+        """
+        The days [start, stop) as a MarketData of views into this one (nothing is copied).
+        Windows are kept, so every engine backtesting the same days shares one.
+        """
+        start, stop, _ = slice(start, stop).indices(self.totalDays)
+        window = self._windows.get((start, stop))
+        if window is None:
+            window = MarketData({instrument: prices[start:stop] for instrument, prices in self.prices.items()},
+                                dataFolder=self.dataFolder, matrix=self.matrix[start:stop])
+            window.start = start
+            window.warmup = {instrument: prices[:start] for instrument, prices in self.prices.items()}
+            self._windows[(start, stop)] = window
+        return window
+
+
+def price_files(dataFolder):
+    # Instrument name -> CSV path, in directory order
+    files = {}
+    for file in os.listdir(dataFolder):
+        if file.endswith(PRICE_FILE_SUFFIX):
+            files[file[:-len(PRICE_FILE_SUFFIX)]] = os.path.join(dataFolder, file)
+    return files
+
+
+def _fingerprint(files):
+    fingerprint = []
+    for instrument, filePath in files.items():
+        stat = os.stat(filePath)
+        fingerprint.append((instrument, stat.st_mtime_ns, stat.st_size))
+    return tuple(fingerprint)
+
+
+def read_manifest(dataFolder):
+    # The folder's bundle manifest, or None if it has no bundle
+    path = os.path.join(dataFolder, BUNDLE_MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        manifest = json.load(file)
+    if manifest.get('format') != BUNDLE_FORMAT:
+        raise ValueError(f"{path} is bundle format {manifest.get('format')}, expected {BUNDLE_FORMAT}.")
+    return manifest
+
+
+def _bundle_is_current(dataFolder, manifest, files):
+    # A bundle is out of date if any CSV next to it was written after it
+    pricesPath = os.path.join(dataFolder, manifest['prices'])
+    if not os.path.exists(pricesPath):
+        return False
+    written = os.stat(pricesPath).st_mtime_ns
+    return all(os.stat(filePath).st_mtime_ns <= written for filePath in files.values())
+
+
+def load_market_data(dataFolder, instruments=None, events=NULL_SINK):
+    """
+    Load the price histories in dataFolder, reusing this process's copy if the files are unchanged.
+
+    If the folder holds a bundle (and no CSV file is newer than it) the bundle is memory-mapped,
+    otherwise every *_price_history.csv is parsed.
+
+    Parameters:
+        dataFolder (str): Folder holding the price history files.
+        instruments (iterable): If given, only these instruments are loaded.
+        events (EventSink): Sink for the diagnostics of loading (a stale bundle, skipped datasets).
+    """
+    files = price_files(dataFolder)
+    manifest = read_manifest(dataFolder)
+    if manifest is not None and not _bundle_is_current(dataFolder, manifest, files):
+        if events.enabled(WARNING):
+            events.emit(StaleBundle(dataFolder))
+        manifest = None
+    if manifest is not None:
+        files = {BUNDLE_MANIFEST: os.path.join(dataFolder, BUNDLE_MANIFEST),
+                 manifest['prices']: os.path.join(dataFolder, manifest['prices'])}
+    allowed = None if instruments is None else frozenset(instruments)
+    key = (_fingerprint(files), allowed)
+    folder = os.path.abspath(dataFolder)
+    cached = _cache.get(folder)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    if manifest is not None:
+        marketData = _load_bundle(dataFolder, manifest, allowed, events)
+        _cache[folder] = (key, marketData)
+        return marketData
+
+    prices = {}
+    for instrumentName, filePath in files.items():
+        if allowed is None or instrumentName in allowed:
+            prices[instrumentName] = pd.read_csv(filePath)['Price'].to_numpy(dtype=float)
+        elif events.enabled(INFO):
+            events.emit(DatasetSkipped(instrumentName, dataFolder))
+    # Ensure that all data have same length of days
+    numDays = len(next(iter(prices.values())))
+    for history in prices.values():
+        # if a dataset has a different number of days, fail (raised rather than exiting, so a worker
+        # process loading the data reports it instead of dying)
+        if len(history) != numDays:
+            if events.enabled(ERROR):
+                events.emit(DatasetLengthMismatch(dataFolder, {instrument: len(history)
+                                                               for instrument, history in prices.items()}))
+            raise ValueError(f"Error, not all datasets in {dataFolder} are the same length.")
+
+    marketData = MarketData(prices, dataFolder=dataFolder)
+    _cache[folder] = (key, marketData)
+    return marketData
+
+
+def _load_bundle(dataFolder, manifest, allowed, events=NULL_SINK):
+    # Memory-map the bundle's price matrix; each instrument's prices are a view of its column
+    matrix = np.load(os.path.join(dataFolder, manifest['prices']), mmap_mode='r')
+    if matrix.shape != (manifest['days'], len(manifest['instruments'])):
+        raise ValueError(f"The bundle in {dataFolder} does not match its manifest.")
+    prices = {}
+    for column, instrumentName in enumerate(manifest['instruments']):
+        if allowed is None or instrumentName in allowed:
+            prices[instrumentName] = matrix[:, column]
+        elif events.enabled(INFO):
+            events.emit(DatasetSkipped(instrumentName, dataFolder))
+    # The mapped matrix can only be used as is if no columns were dropped
+    full = len(prices) == len(manifest['instruments'])
+    return MarketData(prices, dataFolder=dataFolder, matrix=matrix if full else None)
+
+
+def write_bundle(dataFolder, outputFolder=None):
+    """
+    Convert the CSV price histories in dataFolder into a bundle (manifest.json and prices.npy) in outputFolder.
+
+    Parameters:
+        dataFolder (str): Folder holding the *_price_history.csv files.
+        outputFolder (str): Where to write the bundle. Defaults to dataFolder, where load_market_data picks it up.
+    """
+    outputFolder = dataFolder if outputFolder is None else outputFolder
+    os.makedirs(outputFolder, exist_ok=True)
+    prices = {instrumentName: pd.read_csv(filePath)['Price'].to_numpy(dtype=float)
+              for instrumentName, filePath in price_files(dataFolder).items()}
+    marketData = MarketData(prices, dataFolder=dataFolder)
+    # Column-major, so every instrument's history is contiguous on disk and in the mapping
+    np.save(os.path.join(outputFolder, 'prices.npy'), np.asfortranarray(marketData.matrix))
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'prices': 'prices.npy',
+        'days': marketData.totalDays,
+        'instruments': marketData.instruments,
+    }
+    with open(os.path.join(outputFolder, BUNDLE_MANIFEST), 'w') as file:
+        json.dump(manifest, file, indent=2)
+    return manifest
+
+
+def clear_cache():
+    _cache.clear()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert a folder of price history CSV files into a bundle.")
+    parser.add_argument('dataFolder')
+    parser.add_argument('--output', help="folder to write the bundle to (default: dataFolder)")
+    args = parser.parse_args()
+    manifest = write_bundle(args.dataFolder, args.output)
+    print(f"Wrote {len(manifest['instruments'])} instruments x {manifest['days']} days "
+          f"to {args.output or args.dataFolder}")
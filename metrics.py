@@ -0,0 +1,211 @@
+"""
+Risk and performance metrics of a TradingEngine run.
+
+The metrics are computed from daily PnL in dollars: the engine's total daily returns (totalReturnHistory)
+and each instrument's daily returns (returnsHistory), read from their cent arrays rather than the Decimal
+lists. There is no capital base, so ratios are of dollar PnL (Sharpe and Sortino do not depend on one):
+
+    sharpe        mean daily PnL / its standard deviation, annualised
+    sortino       mean daily PnL / its downside deviation (root mean square of the losses), annualised
+    max_drawdown  largest fall of the cumulative PnL from a running peak (the flat start counts as 0)
+    max_drawdown_days  longest time spent under a running peak, in days
+    calmar        annualised PnL / max_drawdown
+
+Every function takes a (days,) array or a (days x columns) array, and works along the days, so the total
+and every instrument are done in one call. risk_metrics only uses a few reductions, so it is cheap enough
+to score every optimizer candidate with (see OBJECTIVES and optimize_instrument_params(metric=...)):
+
+    engine.run_algorithms(algo, output_daily_to_CLI=False)
+    engine.performance_metrics()["total"]["sharpe"]
+"""
+import numpy as np
+
+# Trading days in a year of the price data (daily prices, every day of the year)
+PERIODS_PER_YEAR = 365
+
+# Days in each rolling volatility window
+ROLLING_WINDOW = 20
+
+# Objective score of a run that made money without any of the risk its ratio divides by (e.g. no losing days
+# for Sortino, no drawdown for Calmar), negated if it lost money. Finite, so replicate statistics still work,
+# and above any ratio a real run reaches
+UNBOUNDED_RATIO = 1e9
+
+
+def _divide(numerator, denominator):
+    # numerator / denominator, nan where the denominator is 0
+    numerator, denominator = np.broadcast_arrays(np.asarray(numerator, dtype=float),
+                                                 np.asarray(denominator, dtype=float))
+    result = np.full(numerator.shape, np.nan)
+    np.divide(numerator, denominator, out=result, where=denominator != 0)
+    return result if result.ndim else result.item()
+
+
+def drawdowns(returns):
+    """Drawdown of the cumulative PnL from its running peak on each day (>= 0), shaped like returns."""
+    cumulative = np.cumsum(np.asarray(returns, dtype=float), axis=0)
+    return np.maximum.accumulate(np.maximum(cumulative, 0), axis=0) - cumulative
+
+
+def max_drawdown(returns):
+    """(maximum drawdown in $, longest number of days spent in a drawdown)."""
+    underwater = drawdowns(returns)
+    if not len(underwater):
+        return 0.0, 0
+    # Length of the current run of days under water: days since the last day at a peak
+    days = np.arange(1, len(underwater) + 1).reshape((-1,) + (1,) * (underwater.ndim - 1))
+    lastPeak = np.maximum.accumulate(np.where(underwater > 0, 0, days), axis=0)
+    duration = (days - lastPeak).max(axis=0)
+    return underwater.max(axis=0), duration
+
+
+def rolling_volatility(returns, window=ROLLING_WINDOW, periodsPerYear=PERIODS_PER_YEAR):
+    """
+    Annualised standard deviation of the daily PnL over each trailing window, from running sums (so it is
+    one pass whatever the window). Days before the first full window are nan.
+    """
+    returns = np.asarray(returns, dtype=float)
+    result = np.full(returns.shape, np.nan)
+    if len(returns) < window:
+        return result
+    # Centred on the mean, so the running sums of squares keep their precision
+    centred = returns - returns.mean(axis=0)
+    zero = np.zeros((1,) + returns.shape[1:])
+    sums = np.concatenate([zero, np.cumsum(centred, axis=0)])
+    squares = np.concatenate([zero, np.cumsum(centred ** 2, axis=0)])
+    windowSums = sums[window:] - sums[:-window]
+    windowSquares = squares[window:] - squares[:-window]
+    variance = np.maximum(windowSquares / window - (windowSums / window) ** 2, 0)
+    result[window - 1:] = np.sqrt(variance * periodsPerYear)
+    return result
+
+
+def risk_metrics(returns, periodsPerYear=PERIODS_PER_YEAR):
+    """
+    Return and risk metrics of daily PnL.
+
+    Parameters:
+        returns: (days,) or (days x columns) daily PnL in $.
+        periodsPerYear (int): Days per year, to annualise with.
+
+    Returns:
+        dict: Metric -> value (or array of one value per column).
+    """
+    returns = np.asarray(returns, dtype=float)
+    if not len(returns):
+        empty = np.zeros(returns.shape[1:])
+        return {"pnl": empty, "mean": empty, "volatility": empty, "sharpe": empty * np.nan,
+                "sortino": empty * np.nan, "max_drawdown": empty, "max_drawdown_days": empty.astype(np.int64),
+                "calmar": empty * np.nan}
+    mean = returns.mean(axis=0)
+    std = returns.std(axis=0)
+    annualised = np.sqrt(periodsPerYear)
+    downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2, axis=0))
+    drawdown, drawdownDays = max_drawdown(returns)
+    return {
+        "pnl": returns.sum(axis=0),
+        "mean": mean,
+        "volatility": std * annualised,
+        "sharpe": _divide(mean * annualised, std),
+        "sortino": _divide(mean * annualised, downside),
+        "max_drawdown": drawdown,
+        "max_drawdown_days": drawdownDays,
+        "calmar": _divide(mean * periodsPerYear, drawdown),
+    }
+
+
+def exposure(positions, limits):
+    """Per column: fraction of days with a position, and mean absolute position as a fraction of the limit."""
+    positions = np.asarray(positions)
+    if not len(positions):
+        return np.zeros(positions.shape[1:]), np.zeros(positions.shape[1:])
+    return (positions != 0).mean(axis=0), (np.abs(positions) / np.asarray(limits)).mean(axis=0)
+
+
+def budget_utilization(budgetUsed, budget):
+    """Mean, 95th percentile and maximum of the daily value held as a fraction of the daily budget."""
+    used = np.asarray(budgetUsed, dtype=float) / budget
+    if not len(used):
+        return {"mean": 0.0, "p95": 0.0, "max": 0.0}
+    return {"mean": used.mean().item(), "p95": np.quantile(used, 0.95).item(), "max": used.max().item()}
+
+
+def _plain(value):
+    # JSON-serializable Python value, with nan as None
+    value = value.item() if isinstance(value, np.generic) or (isinstance(value, np.ndarray) and not value.ndim) \
+        else value
+    return None if isinstance(value, float) and np.isnan(value) else value
+
+
+def performance_metrics(engine, periodsPerYear=PERIODS_PER_YEAR, rollingWindow=ROLLING_WINDOW):
+    """
+    Risk and performance metrics of a run, over the days run so far.
+
+    Returns:
+        dict: "total" (risk_metrics of the total daily PnL, with its rolling volatility's last and maximum
+        values), "instruments" (instrument -> risk_metrics plus "days_exposed" and "avg_exposure", the mean
+        absolute position as a fraction of the limit) and "budget" (budget_utilization), JSON-serializable.
+    """
+    days = engine.daysRun
+    instrumentReturns = engine.returnsCentsMatrix[:days] / 100
+    totalReturns = engine.totalReturnCentsArray[:days] / 100
+    total = {name: _plain(value) for name, value in risk_metrics(totalReturns, periodsPerYear).items()}
+    volatility = rolling_volatility(totalReturns, rollingWindow, periodsPerYear)
+    filled = volatility[~np.isnan(volatility)]
+    total["rolling_volatility_last"] = _plain(filled[-1]) if len(filled) else None
+    total["rolling_volatility_max"] = _plain(filled.max()) if len(filled) else None
+
+    perInstrument = risk_metrics(instrumentReturns, periodsPerYear)
+    perInstrument["days_exposed"], perInstrument["avg_exposure"] = exposure(engine.positionMatrix[:days],
+                                                                            engine.universe.limits)
+    instruments = {instrument: {name: _plain(values[column]) for name, values in perInstrument.items()}
+                   for column, instrument in enumerate(engine.universe.instruments)}
+    return {
+        "total": total,
+        "instruments": instruments,
+        "budget": budget_utilization(engine.budgetUsedArray[:days], engine.totalDailyBudget),
+    }
+
+
+# Objectives are module level, so an optimizer's objective can be sent to worker processes
+def total_pnl(engine):
+    return float(engine.get_total_PnL())
+
+
+def _total_metric(engine, name):
+    metrics = risk_metrics(engine.totalReturnCentsArray[:engine.daysRun] / 100)
+    value = metrics[name]
+    if np.isnan(value):
+        # Nothing to divide by: a flat run scores 0, one that made (or lost) money the best (or worst) score
+        return float(np.sign(metrics["mean"]) * UNBOUNDED_RATIO)
+    return float(value)
+
+
+def total_sharpe(engine):
+    return _total_metric(engine, "sharpe")
+
+
+def total_sortino(engine):
+    return _total_metric(engine, "sortino")
+
+
+def total_calmar(engine):
+    return _total_metric(engine, "calmar")
+
+
+# Objectives an optimizer can maximise: name -> (engine that has been run -> float)
+OBJECTIVES = {
+    "pnl": total_pnl,
+    "sharpe": total_sharpe,
+    "sortino": total_sortino,
+    "calmar": total_calmar,
+}
+
+
+def objective_function(metric):
+    """The OBJECTIVES function of a metric name, or metric itself if it is already a function."""
+    if callable(metric):
+        return metric
+    if metric not in OBJECTIVES:
+        raise ValueError(f"Unknown metric {metric!r}, expected one of: {', '.join(OBJECTIVES)}.")
+    return OBJECTIVES[metric]
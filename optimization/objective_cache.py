@@ -0,0 +1,64 @@
+"""
+Memo of objective values, keyed on the converted (e.g. integer rounded) parameters.
+
+The optimizers round continuous candidates to integers, so many population members land on the same
+parameters. Caching on the converted parameters means each distinct point is only backtested once.
+Given a path, values are also written to a SQLite file so an interrupted tuning session can be resumed
+without recomputing the points it already knows.
+"""
+import json
+import sqlite3
+
+
+class ObjectiveCache:
+    def __init__(self, path=None, namespace=""):
+        """
+        Parameters:
+            path (str): SQLite file to persist values in. In memory only if None.
+            namespace (str): Identifies the objective (instrument, algorithm, data, ...) so one file
+                can hold results for several optimizations without them mixing.
+        """
+        self.path = path
+        self.namespace = namespace
+        self.values = {}
+        self.hits = 0
+        self.connection = None
+        if path is not None:
+            self.connection = sqlite3.connect(path)
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS objective_values ("
+                "namespace TEXT, params TEXT, value REAL, PRIMARY KEY (namespace, params))"
+            )
+            rows = self.connection.execute(
+                "SELECT params, value FROM objective_values WHERE namespace = ?", (namespace,)
+            )
+            self.values.update(rows)
+
+    @staticmethod
+    def key(param_values):
+        # numpy scalars (e.g. from an identity conversion) are stored as their plain Python value
+        return json.dumps(param_values, sort_keys=True, default=lambda value: value.item())
+
+    def get(self, param_values):
+        """Return the stored value for these parameters, or None if they have not been evaluated."""
+        value = self.values.get(self.key(param_values))
+        if value is not None:
+            self.hits += 1
+        return value
+
+    def put(self, param_values, value):
+        key = self.key(param_values)
+        self.values[key] = value
+        if self.connection is not None:
+            with self.connection:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO objective_values VALUES (?, ?, ?)", (self.namespace, key, value)
+                )
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def __len__(self):
+        return len(self.values)
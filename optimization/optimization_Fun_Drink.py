@@ -1,7 +1,12 @@
 def optimize_fun_drink_params():
     from simulation import TradingEngine
     from algorithm import Algorithm
+    from events import NULL_SINK
     from scipy.optimize import differential_evolution
+    from optimizer import declared_deterministic, run_replicates
+
+    # Deterministic backtests only need running once per candidate
+    deterministic = declared_deterministic(Algorithm, TradingEngine)
 
     def objective(params):
         # Unpack and cast parameters for the SMA strategy.
@@ -12,10 +17,8 @@ def optimize_fun_drink_params():
         if sma_window < 2 or trade_size < 100:
             return 1e6  # Large penalty if below realistic values.
 
-        pnl_sum = 0.0
-        n_runs = 3  # Average over multiple simulation runs.
-        for _ in range(n_runs):
-            engine = TradingEngine()
+        def run_once():
+            engine = TradingEngine(events=NULL_SINK)
             # Override only the Fun Drink parameters, merging with the default config.
             config = {
                 "Fun Drink": {
@@ -25,8 +28,10 @@ def optimize_fun_drink_params():
             }
             algo = Algorithm(positions=engine.positions, config=config)
             engine.run_algorithms(algo, output_daily_to_CLI=False)
-            pnl_sum += float(engine.get_total_PnL())
-        avg_pnl = pnl_sum / n_runs
+            return float(engine.get_total_PnL())
+
+        n_runs = 3  # Average over multiple simulation runs (unless deterministic).
+        avg_pnl, std_pnl, _ = run_replicates(run_once, n_runs, deterministic)
         # Since we want to maximize PnL, we return its negative.
         return -avg_pnl
 
@@ -1,7 +1,12 @@
 def optimize_bounds():
     from simulation import TradingEngine
     from algorithm import Algorithm
+    from events import NULL_SINK
     from scipy.optimize import differential_evolution
+    from optimizer import declared_deterministic, run_replicates
+
+    # Deterministic backtests only need running once per candidate
+    deterministic = declared_deterministic(Algorithm, TradingEngine)
 
     def objective(params):
         lower, upper = params
@@ -9,12 +14,10 @@ def optimize_bounds():
         if lower >= upper:
             return 1e6 + (lower - upper) ** 2
 
-        # Optionally, average over multiple runs to reduce noise:
-        pnl_sum = 0
-        n_runs = 3
-        for _ in range(n_runs):
+        def run_once():
             engine = TradingEngine(
-                dataFolder="../data/seen_data"
+                dataFolder="../data/seen_data",
+                events=NULL_SINK
             )
             # Create a config dictionary that includes both the bounds and indicator parameters.
             config = {
@@ -23,8 +26,11 @@ def optimize_bounds():
             }
             algo = Algorithm(positions=engine.positions, config=config)
             engine.run_algorithms(algo, output_daily_to_CLI=False)
-            pnl_sum += float(engine.get_total_PnL())
-        avg_pnl = pnl_sum / n_runs
+            return float(engine.get_total_PnL())
+
+        # Optionally, average over multiple runs to reduce noise (a deterministic backtest is run once):
+        n_runs = 3
+        avg_pnl, std_pnl, _ = run_replicates(run_once, n_runs, deterministic)
 
         # We want to maximize PnL so we return negative PnL.
         return -avg_pnl
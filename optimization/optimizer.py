@@ -3,85 +3,319 @@ This is like a general use optimizer, meaning it's a fair bit more wordy than it
 it's meant to be able to take an arbitrary number of parameters and optimize them.
 
 A better explanation of how the optimizer works can be seen in the optimize_UQ_Dollar.py file.
+
+Candidates can be evaluated across a process pool with `workers` (same meaning as in scipy's
+differential_evolution). Engines share the process-wide market data store, so each worker process
+parses the price data once and reuses it for every candidate it is given.
+
+Objective values are memoized on the converted parameters (see objective_cache.py), so candidates that
+round to the same parameters are only backtested once, optionally persisted to SQLite with `cache_path`.
+
+By default the total PnL is maximised. `metric` maximises a risk-adjusted one instead ("sharpe",
+"sortino" or "calmar", see metrics.OBJECTIVES), or any module level function of a run engine.
 """
+import copy
+import multiprocessing
+import statistics
 
+from objective_cache import ObjectiveCache
 
 
+def int_round(x):
+    # Module level (rather than a lambda) so it can be sent to worker processes
+    return int(round(x))
 
-def optimize_instrument_params(
-        instrument,
-        param_names,
-        bounds,
-        conversion_funcs,
-        algo_class,
-        simulation_engine_class,
-        n_runs=3,
-        constraint_func=None
-):
-    from scipy.optimize import differential_evolution
 
-    # Mutable counter for tracking iterations
-    iteration = [0]
+def declared_deterministic(*classes):
+    # Algorithms and engines opt in with a `deterministic = True` class attribute
+    return all(getattr(cls, "deterministic", False) for cls in classes)
 
-    def objective(params):
+
+def run_replicates(run_once, n_runs, deterministic=False):
+    """
+    Run a backtest n_runs times and return (mean, std, results).
+    A deterministic backtest is only run once and its result reused for every replicate.
+    """
+    results = [run_once()]
+    if deterministic:
+        return results[0], 0.0, results * n_runs
+    results += [run_once() for _ in range(n_runs - 1)]
+    return statistics.fmean(results), statistics.pstdev(results), results
+
+
+class InstrumentObjective:
+    def __init__(self, instrument, param_names, conversion_funcs, algo_class, simulation_engine_class,
+                 n_runs=3, constraint_func=None, dataFolder="../data/seen_data", cache=None, events=None,
+                 days=None, metric="pnl"):
+        self.instrument = instrument
+        self.param_names = param_names
+        self.conversion_funcs = conversion_funcs
+        self.algo_class = algo_class
+        self.simulation_engine_class = simulation_engine_class
+        self.n_runs = n_runs
+        self.constraint_func = constraint_func
+        self.dataFolder = dataFolder
+        # ObjectiveCache of already evaluated (converted) parameters, or None to always evaluate
+        self.cache = cache
+        # Sink for the backtests' events, None to silence them (sent to workers, so it must be picklable)
+        self.events = events
+        # (start, stop) days of the data to backtest on, None for all of it
+        self.days = days
+        # What is maximised: a metrics.OBJECTIVES name, or a function of the engine after the backtest
+        self.metric = metric
+        # None until the first candidate has been run and the declaration checked
+        self.deterministic = None
+        # Replicate statistics (mean, std, n_runs) of the most recent evaluation, and of every evaluated
+        # parameter set by cache key, so progress can be reported without backtesting again
+        self.last_stats = None
+        self.replicate_stats = {}
+
+    def convert(self, params):
         # Convert optimizer parameters to their proper types
         param_values = {}
-        for i, name in enumerate(param_names):
-            conv = conversion_funcs[i] if conversion_funcs and i < len(conversion_funcs) else (lambda x: x)
+        for i, name in enumerate(self.param_names):
+            conv = self.conversion_funcs[i] if self.conversion_funcs and i < len(self.conversion_funcs) else (lambda x: x)
             param_values[name] = conv(params[i])
+        return param_values
 
+    def namespace(self):
+        # Identifies this objective's results in a shared cache file
+        parts = [
+            self.instrument,
+            f"{self.algo_class.__module__}.{self.algo_class.__qualname__}",
+            f"{self.simulation_engine_class.__module__}.{self.simulation_engine_class.__qualname__}",
+            str(self.dataFolder),
+            f"n_runs={self.n_runs}",
+        ]
+        if self.days is not None:
+            parts.append(f"days={self.days[0]}:{self.days[1]}")
+        if self.metric != "pnl":
+            parts.append(f"metric={getattr(self.metric, '__name__', self.metric)}")
+        return "|".join(parts)
+
+    def __call__(self, params):
+        param_values = self.convert(params)
+        if self.cache is not None:
+            cached = self.cache.get(param_values)
+            if cached is not None:
+                return cached
+        value = self.evaluate(param_values)
+        if self.cache is not None:
+            self.cache.put(param_values, value)
+        return value
+
+    def evaluate(self, param_values):
         # Apply any constraint function (should return 0 if no violation, >0 otherwise)
-        if constraint_func:
-            penalty = constraint_func(param_values)
+        if self.constraint_func:
+            penalty = self.constraint_func(param_values)
             if penalty > 0:
                 return 1e6 + penalty  # Large penalty for violating constraints
 
-        # Run the simulation several times to reduce noise
-        pnl_sum = 0.0
-        for _ in range(n_runs):
-            engine = simulation_engine_class(
-                dataFolder="../data/seen_data"
-            )
+        def run_once():
+            from events import NULL_SINK
+            from metrics import objective_function
+            events = self.events if self.events is not None else NULL_SINK
+            # Only passed when set, so engine classes without a days window still work
+            window = {"days": self.days} if self.days is not None else {}
+            engine = self.simulation_engine_class(dataFolder=self.dataFolder, events=events, **window)
             # Merge the optimized parameters into the instrument's config.
-            config = {instrument: param_values}
-            algo = algo_class(positions=engine.positions, config=config)
+            config = {self.instrument: param_values}
+            algo = self.algo_class(positions=engine.positions, config=config)
             engine.run_algorithms(algo, output_daily_to_CLI=False)
-            pnl_sum += float(engine.get_total_PnL())
-        avg_pnl = pnl_sum / n_runs
-        # We want to maximize profit, so return the negative of average PnL.
+            return objective_function(self.metric)(engine)
+
+        if self.deterministic is None:
+            self.deterministic = False
+            if self.n_runs > 1 and declared_deterministic(self.algo_class, self.simulation_engine_class):
+                # Check the declaration once: two replicates of the first candidate must agree exactly
+                avg_pnl, std_pnl, results = run_replicates(run_once, 2)
+                self.deterministic = results[0] == results[1]
+                if not self.deterministic:
+                    print("Warning: backtests declared deterministic gave different results, averaging replicates.")
+                    avg_pnl, std_pnl, results = run_replicates(run_once, self.n_runs)
+                self.record_stats(param_values, (avg_pnl, std_pnl, self.n_runs))
+                return -avg_pnl
+
+        # Run the simulation several times to reduce noise (just once if it is deterministic)
+        avg_pnl, std_pnl, results = run_replicates(run_once, self.n_runs, self.deterministic)
+        self.record_stats(param_values, (avg_pnl, std_pnl, self.n_runs))
+        # We want to maximize profit (or the metric), so return the negative of its average.
         return -avg_pnl
 
-    def callback(xk, convergence):
-        iteration[0] += 1
-        current_params = {}
-        for i, name in enumerate(param_names):
-            conv = conversion_funcs[i] if conversion_funcs and i < len(conversion_funcs) else (lambda x: x)
-            current_params[name] = conv(xk[i])
-        current_pnl = -objective(xk)
-        param_str = ', '.join(f"{name}={value}" for name, value in current_params.items())
-        print(f"Iteration {iteration[0]}: Current best: {param_str}, PnL = {current_pnl:.2f}")
 
-    # Run the differential evolution optimizer
-    result = differential_evolution(
-        objective, bounds,
+    def record_stats(self, param_values, stats):
+        self.last_stats = stats
+        self.replicate_stats[ObjectiveCache.key(param_values)] = stats
+
+
+# The objective each worker process evaluates, set once by the pool initializer
+_worker_objective = None
+
+
+def _worker_copy(objective):
+    # What the pool's workers are sent. The parent process owns the cache (and its SQLite connection, which
+    # cannot be pickled), workers just evaluate what they are sent
+    worker = copy.copy(objective)
+    worker.cache = None
+    return worker
+
+
+def _init_worker(objective):
+    global _worker_objective
+    _worker_objective = objective
+    # Load the price data into this process's market data store up front, rather than on the first candidate
+    objective.simulation_engine_class(dataFolder=objective.dataFolder)
+
+
+def _evaluate_in_worker(param_values):
+    # The replicate statistics are sent back too, as the parent reports them
+    _worker_objective.last_stats = None
+    value = _worker_objective.evaluate(param_values)
+    return value, _worker_objective.last_stats
+
+
+class _PoolMap:
+    # Map-like callable for differential_evolution that sends candidates to the worker pool.
+    # Workers already hold the objective, so only the converted parameters are sent between processes.
+    # Candidates already in the cache, or repeated within the generation, are not sent at all.
+    def __init__(self, pool, objective):
+        self.pool = pool
+        self.objective = objective
+
+    def __call__(self, func, iterable):
+        cache = self.objective.cache
+        results = []
+        pending = {}  # cache key -> (param_values, indices of candidates with those parameters)
+        for index, params in enumerate(iterable):
+            param_values = self.objective.convert(params)
+            cached = cache.get(param_values) if cache is not None else None
+            results.append(cached)
+            if cached is None:
+                pending.setdefault(ObjectiveCache.key(param_values), (param_values, []))[1].append(index)
+        evaluated = self.pool.map(_evaluate_in_worker, [param_values for param_values, _ in pending.values()])
+        for (param_values, indices), (value, stats) in zip(pending.values(), evaluated):
+            if stats is not None:
+                self.objective.record_stats(param_values, stats)
+            if cache is not None:
+                cache.put(param_values, value)
+            for index in indices:
+                results[index] = value
+        return results
+
+
+def optimize_instrument_params(
+        instrument,
+        param_names,
+        bounds,
+        conversion_funcs,
+        algo_class,
+        simulation_engine_class,
+        n_runs=3,
+        constraint_func=None,
+        workers=1,
+        seed=None,
+        dataFolder="../data/seen_data",
         popsize=5,
         maxiter=200,
-        disp=True,
-        polish=True,
-        callback=callback
+        updating=None,
+        memoize=None,
+        cache_path=None,
+        days=None,
+        metric="pnl",
+        verbose=True
+):
+    """
+    workers: 1 evaluates serially, an int > 1 (or -1 for every core) evaluates each generation across
+    a process pool, and a map-like callable is passed straight through to differential_evolution.
+    seed: fixes the optimizer's random state. Parallel runs use deferred updating, so they give the same
+    result for any number of workers (pass updating="deferred" to reproduce them serially).
+    memoize: reuse the objective value of parameters that have already been evaluated. Defaults to on
+    for algorithms and engines declared deterministic, and off for stochastic ones.
+    cache_path: SQLite file the memoized values are also saved to, so an interrupted run can be resumed.
+    days: (start, stop) to only backtest those days of the data, e.g. a walk-forward training window.
+    metric: what to maximise, "pnl" (the default), "sharpe", "sortino", "calmar" (see metrics.OBJECTIVES), or
+    a module level function of the engine after a backtest. The returned value is of this metric.
+    verbose: print progress and the result (False for e.g. the many runs of a walk-forward study).
+    """
+    from scipy.optimize import differential_evolution
+
+    objective = InstrumentObjective(
+        instrument, param_names, conversion_funcs, algo_class, simulation_engine_class,
+        n_runs=n_runs, constraint_func=constraint_func, dataFolder=dataFolder, days=days, metric=metric
     )
+    label = "PnL" if metric == "pnl" else getattr(metric, "__name__", metric)
+    deterministic = declared_deterministic(algo_class, simulation_engine_class)
+    if memoize is None:
+        memoize = deterministic
+    if memoize or cache_path is not None:
+        objective.cache = ObjectiveCache(cache_path, namespace=objective.namespace())
+
+    # Mutable counter for tracking iterations
+    iteration = [0]
+
+    def callback(xk, convergence):
+        iteration[0] += 1
+        current_params = objective.convert(xk)
+        param_str = ', '.join(f"{name}={value}" for name, value in current_params.items())
+        if deterministic:
+            # Already evaluated, so this comes straight from the cache
+            current_pnl = -objective(xk)
+            spread = ""
+        else:
+            # Reported from the replicates run when the candidate was evaluated, rather than run again
+            stats = objective.replicate_stats.get(ObjectiveCache.key(current_params))
+            if stats is None:
+                # No replicates were run for it (it violates the constraint, or came from the cache file)
+                current_pnl, spread = -objective.evaluate(current_params), ""
+            else:
+                current_pnl = stats[0]
+                spread = f" (std {stats[1]:.2f} over {stats[2]} runs)"
+        print(f"Iteration {iteration[0]}: Current best: {param_str}, {label} = {current_pnl:.2f}{spread}")
+
+    # Load the data in this process first, so a bad data folder fails here rather than in every worker
+    simulation_engine_class(dataFolder=dataFolder)
+
+    pool = None
+    if isinstance(workers, int) and workers != 1:
+        processes = multiprocessing.cpu_count() if workers == -1 else workers
+        pool = multiprocessing.Pool(processes, initializer=_init_worker, initargs=(_worker_copy(objective),))
+        de_workers = _PoolMap(pool, objective)
+    else:
+        de_workers = workers
+
+    # Run the differential evolution optimizer. Deferred updating evaluates a whole generation at
+    # once, which is what lets it be spread over workers, and keeps results the same for a given seed.
+    try:
+        result = differential_evolution(
+            objective, bounds,
+            popsize=popsize,
+            maxiter=maxiter,
+            disp=verbose,
+            polish=True,
+            callback=callback if verbose else None,
+            seed=seed,
+            workers=de_workers,
+            updating=updating or ("deferred" if workers != 1 else "immediate")
+        )
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if objective.cache is not None:
+            if verbose:
+                print(f"Backtested {len(objective.cache)} distinct parameter sets "
+                      f"({objective.cache.hits} cache hits).")
+            objective.cache.close()
 
     # Extract and print the optimal parameters.
-    optimal_params = {}
-    for i, name in enumerate(param_names):
-        conv = conversion_funcs[i] if conversion_funcs and i < len(conversion_funcs) else (lambda x: x)
-        optimal_params[name] = conv(result.x[i])
+    optimal_params = objective.convert(result.x)
     max_pnl = -result.fun
 
-    print(f"\nOptimal parameters for {instrument}:")
-    for name, value in optimal_params.items():
-        print(f"  {name}: {value}")
-    print("Maximum Total PnL:", max_pnl)
+    if verbose:
+        print(f"\nOptimal parameters for {instrument}:")
+        for name, value in optimal_params.items():
+            print(f"  {name}: {value}")
+        print("Maximum Total PnL:" if metric == "pnl" else f"Maximum {label}:", max_pnl)
 
     return optimal_params, max_pnl
 
@@ -98,7 +332,7 @@ if __name__ == '__main__':
         (2, 40),  # Bound for sma_window (e.g. 2 to 40 days)
         (100, 10000)  # Bound for trade_size (e.g. 100 to 10,000 units)
     ]
-    conversion_funcs = [lambda x: int(round(x)), lambda x: int(round(x))]
+    conversion_funcs = [int_round, int_round]
 
     optimize_instrument_params(
         instrument="Fun Drink",
@@ -108,5 +342,7 @@ if __name__ == '__main__':
         algo_class=Algorithm,
         simulation_engine_class=TradingEngine,
         n_runs=3,
-        constraint_func=None
+        constraint_func=None,
+        workers=-1,
+        seed=42
     )
@@ -0,0 +1,227 @@
+"""
+Grid, random and successive-halving search over an instrument's parameters, with early pruning.
+
+Differential evolution (optimizer.py) backtests every candidate over every day. Here candidates are
+backtested side by side with a batch run_algorithms (one pass over the data for a whole batch), and the
+run is stopped at a few "rungs" (growing day prefixes). At each rung the poorly performing candidates are
+dropped and only the rest are resumed, so a clearly losing candidate costs a fraction of a backtest.
+
+    grid     every combination of the space's values, in batches; at each rung the candidates below
+             prune_quantile of their batch (by PnL so far) are dropped (None to backtest every day).
+    random   n_candidates drawn from the space, pruned the same way.
+    halving  successive halving: n_candidates drawn from the space all start together, and at each rung
+             only the best 1/eta go on, with rungs eta times apart.
+
+A space maps each parameter to a list of values, or a (low, high) range (ints if both ends are ints,
+both ends included). SEARCH_SPACES has spaces for the instruments in the algorithm's DEFAULT_CONFIG.
+
+Each candidate is backtested once and ranked by PnL, so this is meant for deterministic algorithms.
+"""
+import itertools
+import random
+import time
+
+import numpy as np
+
+SEARCH_SPACES = {
+    "UQ Dollar": {
+        "lower_bound": (95.0, 100.0),
+        "upper_bound": (100.0, 105.0),
+    },
+    "Fintech Token": {
+        "ema_window": (2, 20),
+        "momentum_days": (2, 10),
+    },
+    "Fun Drink": {
+        "ema_window": (2, 40),
+        "threshold": (0.0, 0.5),
+    },
+}
+
+
+def grid_candidates(space, steps=10):
+    """Every combination of the space's values. Ranges are cut into `steps` values (fewer for short int ranges)."""
+    axes = []
+    for values in space.values():
+        if isinstance(values, tuple):
+            low, high = values
+            if isinstance(low, int) and isinstance(high, int):
+                values = sorted(set(np.linspace(low, high, steps).round().astype(int).tolist()))
+            else:
+                values = np.linspace(low, high, steps).tolist()
+        axes.append(values)
+    return [dict(zip(space, combination)) for combination in itertools.product(*axes)]
+
+
+def random_candidates(space, n_candidates, seed=None):
+    """n_candidates drawn independently and uniformly from the space."""
+    rng = random.Random(seed)
+    candidates = []
+    for _ in range(n_candidates):
+        candidate = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                if isinstance(low, int) and isinstance(high, int):
+                    candidate[name] = rng.randint(low, high)
+                else:
+                    candidate[name] = rng.uniform(low, high)
+            else:
+                candidate[name] = rng.choice(values)
+        candidates.append(candidate)
+    return candidates
+
+
+def rung_days(total_days, min_days, eta):
+    """Day prefixes to stop at: min_days, min_days * eta, ... and finally total_days."""
+    rungs = []
+    days = min_days
+    while days < total_days:
+        rungs.append(days)
+        days *= eta
+    return rungs + [total_days]
+
+
+class CandidateSearch:
+    def __init__(self, instrument, algo_class, simulation_engine_class, dataFolder="../data/seen_data",
+                 days=None):
+        """
+        Parameters:
+            instrument (str): Whose config the candidate parameters are merged into.
+            algo_class: Algorithm class, built with config={instrument: candidate}.
+            simulation_engine_class: Engine class (with run_algorithms, resume_run and drop_runs).
+            dataFolder (str): Data to backtest on.
+            days (tuple): (start, stop) days of the data to backtest on, None for all of it.
+        """
+        from events import NULL_SINK
+        self.instrument = instrument
+        self.algo_class = algo_class
+        window = {"days": days} if days is not None else {}
+        # One engine drives every batch; each candidate's state lives in its own fork of it
+        self.engine = simulation_engine_class(dataFolder=dataFolder, events=NULL_SINK, **window)
+        self.totalDays = self.engine.totalDays
+        # Backtested days, summed over every candidate
+        self.daysRun = 0
+
+    def run(self, candidates, rungs, keep):
+        """
+        Backtest candidates side by side, stopping at each rung to drop the ones keep() does not keep.
+
+        Parameters:
+            candidates (list): Parameter dicts.
+            rungs (list): Increasing days to stop at, the last being the end of the data.
+            keep (callable): (PnLs so far as an array) -> boolean mask of the candidates to carry on.
+
+        Returns:
+            list: One result per candidate: {"params", "pnl", "days"} (days it was backtested for).
+        """
+        algorithms = [self.algo_class(positions={}, config={self.instrument: dict(candidate)})
+                      for candidate in candidates]
+        runs = self.engine.run_algorithms(algorithms, output_daily_to_CLI=False, untilDay=rungs[0])
+        alive = runs
+        for nextRung in rungs[1:]:
+            mask = keep(np.array([run.totalPNLCents for run in alive]))
+            self.engine.drop_runs([run for run, kept in zip(alive, mask) if not kept])
+            alive = [run for run, kept in zip(alive, mask) if kept]
+            self.engine.resume_run(nextRung)
+        self.daysRun += sum(run.daysRun for run in runs)
+        return [{"params": candidate, "pnl": float(run.totalPNL), "days": run.daysRun}
+                for candidate, run in zip(candidates, runs)]
+
+
+def keep_best_fraction(eta):
+    # Keep the best 1/eta of the PnLs, at least one (earlier candidates win ties)
+    def keep(pnl):
+        mask = np.zeros(len(pnl), dtype=bool)
+        mask[np.argsort(-pnl, kind="stable")[:max(1, len(pnl) // eta)]] = True
+        return mask
+    return keep
+
+
+def keep_above_quantile(quantile):
+    # Keep PnLs at or above the quantile (so at least the best is always kept)
+    def keep(pnl):
+        return pnl >= np.quantile(pnl, quantile)
+    return keep
+
+
+def search_instrument_params(
+        instrument,
+        algo_class,
+        simulation_engine_class,
+        space=None,
+        method="halving",
+        n_candidates=81,
+        eta=3,
+        min_days=None,
+        prune_quantile=0.5,
+        batch_size=64,
+        grid_steps=10,
+        seed=None,
+        dataFolder="../data/seen_data",
+        days=None,
+        verbose=True
+):
+    """
+    Search an instrument's parameters for the highest PnL.
+
+    space: parameter -> list of values or (low, high) range. Defaults to SEARCH_SPACES[instrument].
+    method: "grid", "random" or "halving" (see the module docstring).
+    n_candidates: candidates drawn for random and halving searches.
+    eta: rungs are eta times apart, and halving keeps the best 1/eta at each.
+    min_days: days backtested before the first pruning. Defaults to the data's days / eta**3.
+    prune_quantile: grid and random searches drop candidates below this quantile of their batch at each
+    rung. None backtests every candidate over every day.
+    batch_size: candidates backtested side by side in one pass by grid and random searches.
+    grid_steps: values a range is cut into for a grid search.
+    days: (start, stop) days of the data to backtest on, None for all of it.
+
+    Returns:
+        tuple: (best parameters, their PnL, every candidate's result). Results have "params", "pnl" and
+        "days"; a pruned candidate's pnl is over the days it was backtested for.
+    """
+    from optimizer import declared_deterministic
+    if not declared_deterministic(algo_class, simulation_engine_class):
+        print("Warning: each candidate is backtested once, but the algorithm or engine is not declared "
+              "deterministic.")
+    space = space or SEARCH_SPACES[instrument]
+    search = CandidateSearch(instrument, algo_class, simulation_engine_class, dataFolder=dataFolder, days=days)
+    totalDays = search.totalDays
+    rungs = rung_days(totalDays, min_days or max(totalDays // eta ** 3, 1), eta)
+    if method == "grid":
+        candidates = grid_candidates(space, grid_steps)
+    elif method in ("random", "halving"):
+        candidates = random_candidates(space, n_candidates, seed)
+    else:
+        raise ValueError(f"Unknown search method {method!r}, expected 'grid', 'random' or 'halving'.")
+
+    started = time.perf_counter()
+    if method == "halving":
+        results = search.run(candidates, rungs, keep_best_fraction(eta))
+    else:
+        if prune_quantile is None:
+            rungs = [totalDays]
+        results = []
+        for start in range(0, len(candidates), batch_size):
+            results += search.run(candidates[start:start + batch_size], rungs, keep_above_quantile(prune_quantile))
+    seconds = time.perf_counter() - started
+
+    finished = [result for result in results if result["days"] == totalDays]
+    best = max(finished, key=lambda result: result["pnl"])
+    if verbose:
+        print(f"{method} search: {len(candidates)} candidates in {seconds:.2f}s "
+              f"({len(candidates) / seconds:.1f}/s), {len(finished)} backtested in full, "
+              f"{search.daysRun / (len(candidates) * totalDays):.0%} of the days of full backtests.")
+        print(f"\nBest parameters for {instrument}:")
+        for name, value in best["params"].items():
+            print(f"  {name}: {value}")
+        print("Maximum Total PnL:", best["pnl"])
+    return best["params"], best["pnl"], results
+
+
+# Example usage:
+if __name__ == '__main__':
+    from algorithm import Algorithm
+    from simulation import TradingEngine
+
+    search_instrument_params("Fun Drink", Algorithm, TradingEngine, method="halving", n_candidates=81, seed=42)
@@ -0,0 +1,218 @@
+"""
+Sensitivity sweeps of the algorithm's per-instrument parameters.
+
+Each instrument's parameters (its DEFAULT_CONFIG keys) are swept over the cartesian product of their
+ranges, and every grid point is scored on that instrument alone: its PnL, maximum drawdown and dollar
+turnover. The engine's PnL is a sum over instruments, so each instrument is swept on its own rather than
+over the product of every instrument's grid. (Only the daily budget couples them: a day over budget zeroes
+every position. The other instruments keep their default config while one is swept, or with isolate=True
+are not traded at all, which removes that coupling and skips evaluating their strategies.)
+
+Grid points are backtested in chunks across a process pool. Each chunk is one batch run_algorithms, so
+it is a single pass over the data. The results of an instrument form a ResultCube, with one axis per
+parameter, saved as a .npz file (or long-format Parquet, if pyarrow is installed):
+
+    cubes = run_sweep({"Fun Drink": {"ema_window": range(2, 41), "threshold": [0.0, 0.05, 0.1, 0.2]}},
+                      Algorithm, TradingEngine, outputDir="./sweeps", workers=-1)
+    cubes["Fun Drink"].pnl[ema_index, threshold_index]
+"""
+import itertools
+import json
+import multiprocessing
+import os
+
+import numpy as np
+
+METRICS = ("pnl", "drawdown", "turnover")
+
+
+class ResultCube:
+    def __init__(self, instrument, axes, metrics):
+        """
+        Parameters:
+            instrument (str): The swept instrument.
+            axes (dict): Parameter name -> array of its values, in axis order.
+            metrics (dict): Metric name -> array shaped like the grid (one dimension per axis).
+        """
+        self.instrument = instrument
+        self.axes = {name: np.asarray(values) for name, values in axes.items()}
+        self.metrics = metrics
+
+    @property
+    def shape(self):
+        return tuple(len(values) for values in self.axes.values())
+
+    def __getattr__(self, name):
+        # cube.pnl, cube.drawdown, ...
+        metrics = self.__dict__.get("metrics", {})
+        if name in metrics:
+            return metrics[name]
+        raise AttributeError(name)
+
+    def params_at(self, index):
+        """Parameter dict of a grid index (a tuple, one entry per axis)."""
+        return {name: values[i].item() for (name, values), i in zip(self.axes.items(), index)}
+
+    def best(self, metric="pnl"):
+        """(parameters, value) of the grid point with the highest metric."""
+        values = self.metrics[metric]
+        index = np.unravel_index(np.nanargmax(values), values.shape)
+        return self.params_at(index), values[index].item()
+
+    def to_frame(self):
+        """Long-format DataFrame: one row per grid point, a column per parameter and metric."""
+        import pandas as pd
+        grid = np.meshgrid(*self.axes.values(), indexing="ij")
+        columns = {name: values.ravel() for name, values in zip(self.axes, grid)}
+        columns.update({name: values.ravel() for name, values in self.metrics.items()})
+        return pd.DataFrame(columns)
+
+    def save(self, path):
+        """Write to a .npz file, or a .parquet file (which needs pyarrow)."""
+        if path.endswith(".parquet"):
+            frame = self.to_frame()
+            frame.attrs = {"instrument": self.instrument}
+            frame.to_parquet(path)
+            return path
+        np.savez_compressed(
+            path,
+            meta=json.dumps({"instrument": self.instrument, "axes": list(self.axes), "metrics": list(self.metrics)}),
+            **{f"axis_{i}": values for i, values in enumerate(self.axes.values())},
+            **{f"metric_{name}": values for name, values in self.metrics.items()},
+        )
+        return path
+
+    def __repr__(self):
+        return f"ResultCube({self.instrument!r}, axes={list(self.axes)}, shape={self.shape})"
+
+
+def load_cube(path):
+    """Load a ResultCube saved as .npz."""
+    with np.load(path) as file:
+        meta = json.loads(str(file["meta"]))
+        axes = {name: file[f"axis_{i}"] for i, name in enumerate(meta["axes"])}
+        metrics = {name: file[f"metric_{name}"] for name in meta["metrics"]}
+    return ResultCube(meta["instrument"], axes, metrics)
+
+
+def instrument_metrics(engine, instrument):
+    """PnL ($), maximum drawdown of the cumulative PnL ($) and dollar turnover of one instrument's run."""
+    column = engine.universe.index[instrument]
+    cumulative = engine.cumulativeReturnsCentsMatrix[:engine.daysRun, column] / 100
+    positions = engine.positionMatrix[:engine.daysRun, column]
+    prices = engine.priceMatrix[:engine.daysRun, column]
+    # Drawdown from the running peak, counting the flat start as a peak of 0
+    peaks = np.maximum.accumulate(np.maximum(cumulative, 0))
+    drawdown = float((peaks - cumulative).max()) if len(cumulative) else 0.0
+    # Value of the units traded each day, starting from no position
+    turnover = float((np.abs(np.diff(positions, prepend=0)) * prices).sum())
+    return float(cumulative[-1]) if len(cumulative) else 0.0, drawdown, turnover
+
+
+def _evaluate_chunk(job):
+    # Pool entry point: backtest a chunk of one instrument's grid points side by side in one pass
+    instrument, points, algo_class, simulation_engine_class, dataFolder, days, isolate = job
+    from events import NULL_SINK
+    window = {"days": days} if days is not None else {}
+    engine = simulation_engine_class(dataFolder=dataFolder, events=NULL_SINK, **window)
+    only = {"instruments": [instrument]} if isolate else {}
+    algorithms = [algo_class(positions={}, config={instrument: dict(point)}, **only) for point in points]
+    runs = engine.run_algorithms(algorithms, output_daily_to_CLI=False)
+    return [instrument_metrics(run, instrument) for run in runs]
+
+
+def sweep_instrument(instrument, ranges, algo_class, simulation_engine_class, dataFolder="../data/seen_data",
+                     days=None, workers=1, chunk_size=32, pool=None, isolate=False):
+    """
+    Backtest every combination of one instrument's parameter values.
+
+    Parameters:
+        instrument (str): Instrument whose config keys are swept.
+        ranges (dict): Config key -> iterable of values. Keys must be parameters the instrument's strategy
+        reads (its `parameters`), or for algorithms without strategies, keys of its config.
+        workers (int): Processes to spread the chunks across (-1 for every core). Ignored if pool is given.
+        chunk_size (int): Grid points backtested side by side per pass over the data.
+        pool: An existing multiprocessing pool to use.
+        isolate (bool): Only trade the swept instrument (the algorithm must take an `instruments` argument).
+
+    Returns:
+        ResultCube
+    """
+    algo = algo_class(positions={})
+    strategy = next((strategy for strategy in getattr(algo, "strategies", ()) if strategy.instrument == instrument),
+                    None)
+    if strategy is not None:
+        known, where = strategy.parameters, f"read by {instrument}'s {type(strategy).__name__} strategy"
+    else:
+        known, where = algo.config.get(instrument, {}), f"in the {instrument} config"
+    unknown = [name for name in ranges if name not in known]
+    if unknown:
+        raise ValueError(f"{', '.join(unknown)} not {where} (known: {', '.join(known)}).")
+    axes = {name: list(values) for name, values in ranges.items()}
+    points = [dict(zip(axes, combination)) for combination in itertools.product(*axes.values())]
+    jobs = [(instrument, points[start:start + chunk_size], algo_class, simulation_engine_class, dataFolder, days,
+             isolate)
+            for start in range(0, len(points), chunk_size)]
+
+    processes = multiprocessing.cpu_count() if workers == -1 else workers
+    if pool is not None:
+        chunks = pool.map(_evaluate_chunk, jobs)
+    elif processes > 1 and len(jobs) > 1:
+        with multiprocessing.Pool(min(processes, len(jobs))) as ownPool:
+            chunks = ownPool.map(_evaluate_chunk, jobs)
+    else:
+        chunks = [_evaluate_chunk(job) for job in jobs]
+
+    results = np.array([metrics for chunk in chunks for metrics in chunk], dtype=float).reshape(-1, len(METRICS))
+    shape = tuple(len(values) for values in axes.values())
+    metrics = {name: results[:, i].reshape(shape) for i, name in enumerate(METRICS)}
+    return ResultCube(instrument, axes, metrics)
+
+
+def run_sweep(ranges, algo_class, simulation_engine_class, dataFolder="../data/seen_data", days=None,
+              outputDir=None, fileFormat="npz", workers=1, chunk_size=32, isolate=False):
+    """
+    Sweep each instrument's parameter ranges independently, sharing one process pool.
+
+    Parameters:
+        ranges (dict): Instrument -> {config key -> iterable of values}.
+        outputDir (str): If given, each cube is saved there as <instrument>.<fileFormat> ("npz" or "parquet").
+        isolate (bool): Only trade the instrument being swept.
+
+    Returns:
+        dict: Instrument -> ResultCube.
+    """
+    processes = multiprocessing.cpu_count() if workers == -1 else workers
+    pool = multiprocessing.Pool(processes) if processes > 1 else None
+    cubes = {}
+    try:
+        for instrument, instrumentRanges in ranges.items():
+            cube = sweep_instrument(instrument, instrumentRanges, algo_class, simulation_engine_class,
+                                    dataFolder=dataFolder, days=days, chunk_size=chunk_size, pool=pool,
+                                    isolate=isolate)
+            cubes[instrument] = cube
+            params, pnl = cube.best()
+            param_str = ', '.join(f"{name}={value}" for name, value in params.items())
+            print(f"{instrument}: {int(np.prod(cube.shape))} points, best {param_str}, PnL = {pnl:.2f}")
+            if outputDir is not None:
+                os.makedirs(outputDir, exist_ok=True)
+                cube.save(os.path.join(outputDir, f"{instrument.replace(' ', '_')}.{fileFormat}"))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return cubes
+
+
+# Example usage:
+if __name__ == '__main__':
+    from algorithm import Algorithm
+    from simulation import TradingEngine
+
+    run_sweep(
+        {
+            "Fun Drink": {"ema_window": range(2, 41), "threshold": [0.0, 0.05, 0.1, 0.2, 0.3]},
+            "Fintech Token": {"ema_window": range(2, 21), "momentum_days": range(2, 11)},
+        },
+        Algorithm, TradingEngine, outputDir="./sweeps", workers=-1
+    )
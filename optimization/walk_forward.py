@@ -0,0 +1,155 @@
+"""
+Walk-forward optimization of one instrument's parameters.
+
+One price history is cut into rolling (or anchored) train/test windows:
+
+    |---- train ----|-- test --|
+              |---- train ----|-- test --|
+                        |---- train ----|-- test --|
+
+optimize_instrument_params tunes the parameters on each training window, and the tuned parameters are
+then backtested on the test window straight after it, which the optimizer never saw. Each test window is
+backtested on its own, starting from no position, so it earns nothing on its first day and nothing is
+carried across window boundaries: the reported test_pnl is a sum of independent per-window PnLs, not the
+PnL of one continuous out-of-sample run over the whole history.
+
+Windows are independent, so they are optimized in parallel (`workers` processes, one window each).
+Every engine in a process backtests a zero-copy window of the same MarketData (see MarketData.window),
+so the data is parsed once per process, and an algorithm backtested on a window has its history padded
+with the real prices before it. Given `holdout_folder` (e.g. the unseen data), the parameters tuned on the
+last window are also backtested on all of it.
+"""
+import multiprocessing
+
+from optimizer import InstrumentObjective, optimize_instrument_params
+
+
+def walk_forward_windows(total_days, train_days, test_days, step=None, anchored=False):
+    """
+    Train/test windows over total_days.
+
+    Parameters:
+        total_days (int): Days of data.
+        train_days (int): Days in each training window (the first one, if anchored).
+        test_days (int): Days in each test window.
+        step (int): Days between window starts. Defaults to test_days, so the test windows tile the data.
+        anchored (bool): Every training window starts on day 0 and grows, instead of rolling forward.
+
+    Returns:
+        list: ((train start, train stop), (test start, test stop)) tuples, stops exclusive.
+    """
+    step = step or test_days
+    if train_days < 1 or test_days < 1 or step < 1:
+        raise ValueError("train_days, test_days and step must be positive.")
+    windows = []
+    trainStop = train_days
+    while trainStop + test_days <= total_days:
+        trainStart = 0 if anchored else trainStop - train_days
+        windows.append(((trainStart, trainStop), (trainStop, trainStop + test_days)))
+        trainStop += step
+    return windows
+
+
+def backtest_params(instrument, params, algo_class, simulation_engine_class, dataFolder, days=None, n_runs=1):
+    """Average PnL of algo_class with the instrument's parameters set to params, over the given days."""
+    objective = InstrumentObjective(instrument, list(params), None, algo_class, simulation_engine_class,
+                                    n_runs=n_runs, dataFolder=dataFolder, days=days)
+    return -objective.evaluate(params)
+
+
+def _run_window(job):
+    # Pool entry point: optimize on one training window, then backtest on its test window
+    window, settings = job
+    train, test = window
+    optimal_params, train_pnl = optimize_instrument_params(days=train, verbose=False, workers=1, **settings)
+    test_pnl = backtest_params(settings["instrument"], optimal_params, settings["algo_class"],
+                               settings["simulation_engine_class"], settings["dataFolder"], days=test,
+                               n_runs=settings["n_runs"])
+    return {"train": train, "test": test, "params": optimal_params, "train_pnl": float(train_pnl),
+            "test_pnl": float(test_pnl)}
+
+
+def walk_forward(
+        instrument,
+        param_names,
+        bounds,
+        conversion_funcs,
+        algo_class,
+        simulation_engine_class,
+        train_days,
+        test_days,
+        step=None,
+        anchored=False,
+        dataFolder="../data/seen_data",
+        holdout_folder=None,
+        workers=1,
+        n_runs=3,
+        constraint_func=None,
+        seed=None,
+        popsize=5,
+        maxiter=200
+):
+    """
+    Walk-forward optimize an instrument's parameters and report their out-of-sample PnL.
+
+    The optimizer arguments are as for optimize_instrument_params. workers is the number of windows
+    optimized at once (-1 for every core); each window's optimization runs serially in its process.
+    Conversion and constraint functions are sent to the worker processes, so they must be module level.
+
+    Returns:
+        dict: "windows" (per window: train and test days, params, train_pnl, test_pnl), "test_pnl" (the sum
+        of the test windows' independent out-of-sample PnLs), and "holdout_pnl" if holdout_folder was given.
+    """
+    total_days = simulation_engine_class(dataFolder=dataFolder).totalDays
+    windows = walk_forward_windows(total_days, train_days, test_days, step, anchored)
+    if not windows:
+        raise ValueError(f"{total_days} days is too short for a {train_days} day training window "
+                         f"and a {test_days} day test window.")
+    settings = dict(instrument=instrument, param_names=param_names, bounds=bounds,
+                    conversion_funcs=conversion_funcs, algo_class=algo_class,
+                    simulation_engine_class=simulation_engine_class, n_runs=n_runs,
+                    constraint_func=constraint_func, seed=seed, dataFolder=dataFolder,
+                    popsize=popsize, maxiter=maxiter)
+    jobs = [(window, settings) for window in windows]
+
+    processes = multiprocessing.cpu_count() if workers == -1 else workers
+    if processes > 1 and len(jobs) > 1:
+        with multiprocessing.Pool(min(processes, len(jobs))) as pool:
+            results = pool.map(_run_window, jobs)
+    else:
+        results = [_run_window(job) for job in jobs]
+
+    report = {"windows": results, "test_pnl": sum(result["test_pnl"] for result in results)}
+    for result in results:
+        param_str = ', '.join(f"{name}={value}" for name, value in result["params"].items())
+        print(f"Train days {result['train'][0]}-{result['train'][1] - 1}: {param_str}, "
+              f"PnL = {result['train_pnl']:.2f} | Test days {result['test'][0]}-{result['test'][1] - 1}: "
+              f"PnL = {result['test_pnl']:.2f}")
+    print(f"Sum of the out-of-sample PnLs of {len(results)} independently backtested windows: "
+          f"{report['test_pnl']:.2f}")
+    if holdout_folder is not None:
+        report["holdout_pnl"] = backtest_params(instrument, results[-1]["params"], algo_class,
+                                                simulation_engine_class, holdout_folder, n_runs=n_runs)
+        print(f"Holdout PnL ({holdout_folder}) with the last window's parameters: {report['holdout_pnl']:.2f}")
+    return report
+
+
+# Example usage:
+if __name__ == '__main__':
+    from algorithm import Algorithm
+    from simulation import TradingEngine
+    from optimizer import int_round
+
+    walk_forward(
+        instrument="Fun Drink",
+        param_names=["ema_window", "threshold"],
+        bounds=[(2, 40), (0.0, 0.5)],
+        conversion_funcs=[int_round, float],
+        algo_class=Algorithm,
+        simulation_engine_class=TradingEngine,
+        train_days=120,
+        test_days=30,
+        holdout_folder="../data/unseen_data",
+        workers=-1,
+        seed=42
+    )
@@ -0,0 +1,129 @@
+"""
+Append-only price history feeds handed to algorithms by the TradingEngine.
+
+Rather than rebuilding every instrument's full history as a new list each day, the engine keeps one
+preallocated float64 buffer per instrument and exposes a growing, read-only window over it. Moving to
+the next day is a single length bump, so the per-day cost stays flat however long the history gets.
+
+Algorithms reading short trailing windows (padded with preloaded prices at the start) keep a HistoryRing
+per instrument instead, so a window is a view with no list building or concatenation.
+"""
+import numpy as np
+
+
+class PriceFeed:
+    def __init__(self, buffer, length=0):
+        """
+        Wrap a price buffer as a growing history.
+
+        Parameters:
+            buffer (array-like): Preallocated prices. Only the first `length` are visible.
+            length (int): Number of prices currently visible to the algorithm.
+        """
+        self._buffer = np.ascontiguousarray(buffer, dtype=np.float64)
+        if not 0 <= length <= len(self._buffer):
+            raise ValueError(f"Feed length {length} outside buffer of size {len(self._buffer)}.")
+        self._length = length
+
+    @classmethod
+    def with_capacity(cls, capacity):
+        """Create an empty feed for pushing ticks into one at a time with append()."""
+        return cls(np.empty(capacity, dtype=np.float64))
+
+    def advance(self, n=1):
+        """Reveal the next n prices of a preloaded buffer."""
+        if self._length + n > len(self._buffer):
+            raise IndexError("Cannot advance price feed past the end of its buffer.")
+        self._length += n
+
+    def append(self, price):
+        """Push a single new tick, doubling the buffer if it is full."""
+        if self._length == len(self._buffer):
+            grown = np.empty(max(1, 2 * len(self._buffer)), dtype=np.float64)
+            grown[:self._length] = self._buffer[:self._length]
+            self._buffer = grown
+        self._buffer[self._length] = price
+        self._length += 1
+
+    def as_array(self):
+        """Zero-copy, read-only array of the visible history."""
+        view = self._buffer[:self._length]
+        view.flags.writeable = False
+        return view
+
+    def tolist(self):
+        return self._buffer[:self._length].tolist()
+
+    def __len__(self):
+        return self._length
+
+    def __bool__(self):
+        return self._length > 0
+
+    def __getitem__(self, key):
+        # Slices only copy the requested window (algorithms ask for short recent windows),
+        # and come back as plain lists so existing list-based indicators keep working.
+        if isinstance(key, slice):
+            return self._buffer[:self._length][key].tolist()
+        index = key + self._length if key < 0 else key
+        if not 0 <= index < self._length:
+            raise IndexError("price feed index out of range")
+        return self._buffer.item(index)
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __add__(self, other):
+        return self.tolist() + list(other)
+
+    def __radd__(self, other):
+        # Allows padding patterns like `preload[-needed:] + history`.
+        return list(other) + self.tolist()
+
+    def __repr__(self):
+        return f"PriceFeed(length={self._length}, capacity={len(self._buffer)})"
+
+
+class HistoryRing:
+    def __init__(self, capacity):
+        """
+        Fixed-capacity history of the most recent prices, for reading trailing windows.
+
+        Every price is written twice, `capacity` apart, in a buffer of twice the capacity. The last n prices
+        are then always one contiguous slice of it, so a window is a view and nothing is allocated per call.
+        A view is only valid until the next price is pushed (the buffer is reused), so read it straight away.
+
+        Parameters:
+            capacity (int): Longest window that can be read.
+        """
+        if capacity < 1:
+            raise ValueError("History capacity must be at least 1.")
+        self.capacity = capacity
+        self._buffer = np.zeros(2 * capacity, dtype=np.float64)
+        self._next = 0  # Where the next price goes (in the first half)
+        self._length = 0
+
+    def append(self, price):
+        self._buffer[self._next] = price
+        self._buffer[self._next + self.capacity] = price
+        self._next = (self._next + 1) % self.capacity
+        self._length = min(self._length + 1, self.capacity)
+
+    def extend(self, prices):
+        # Only the last `capacity` prices can ever be read
+        for price in list(prices)[-self.capacity:]:
+            self.append(price)
+
+    def last(self, n):
+        """Read-only view of the last n prices (all of them, if fewer than n have been pushed)."""
+        n = min(n, self._length)
+        end = self._next + self.capacity
+        view = self._buffer[end - n:end]
+        view.flags.writeable = False
+        return view
+
+    def __len__(self):
+        return self._length
+
+    def __repr__(self):
+        return f"HistoryRing(length={self._length}, capacity={self.capacity})"
@@ -0,0 +1,228 @@
+"""
+Plots and reports of a TradingEngine run.
+
+The drawing functions only take arrays, so the same code draws the interactive windows (pyplot) and the
+headless files. Headless figures are plain matplotlib Figures on an Agg canvas. They never touch pyplot or
+a GUI backend, whatever backend pyplot is using. write_report writes a run's summary and charts into their
+own output directory, and can render the per-instrument charts across a process pool:
+
+    engine.run_algorithms(algo, output_daily_to_CLI=False)
+    engine.write_report(instruments=engine.universe.instruments, workers=4)   # ./simulation_results/run-...
+    engine.write_report(render=False)                                         # summary.json only
+"""
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.gridspec import GridSpec
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+DEFAULT_OUTPUT_DIR = './simulation_results'
+
+
+def new_figure(figsize, headless=True):
+    """A Figure on an Agg canvas, or a pyplot figure to show interactively."""
+    if headless:
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        return fig
+    import matplotlib.pyplot as plt
+    return plt.figure(figsize=figsize)
+
+
+def run_output_dir(root=DEFAULT_OUTPUT_DIR):
+    """A new directory under root for one run's report, named by time and process."""
+    base = os.path.join(root, f"run-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+    path, suffix = base, 1
+    while os.path.exists(path):
+        suffix += 1
+        path = f"{base}-{suffix}"
+    os.makedirs(path)
+    return path
+
+
+def trade_markers(positionsPc):
+    """
+    Days of long entries, short entries and closes in a position history.
+    A change of sign counts as a close and an entry on the same day.
+
+    Returns:
+        tuple: (long days, short days, close days) as lists of ints.
+    """
+    positions = np.asarray(positionsPc)
+    previous, current = positions[:-1], positions[1:]
+    flipped = previous * current < 0
+    longDays = np.flatnonzero(((previous == 0) | flipped) & (current > 0)) + 1
+    shortDays = np.flatnonzero(((previous == 0) | flipped) & (current < 0)) + 1
+    closeDays = np.flatnonzero(((previous != 0) & (current == 0)) | flipped) + 1
+    return longDays.tolist(), shortDays.tolist(), closeDays.tolist()
+
+
+def draw_instrument_details(fig, instrument, prices, positionsPc):
+    """Draw an instrument's prices with its trade markers. Returns the axis."""
+    prices = np.asarray(prices)
+    longDays, shortDays, closeDays = trade_markers(positionsPc)
+    ax = fig.add_subplot()
+    ax.plot(prices, label=f'{instrument} Price', color='black')
+    if longDays:
+        ax.scatter(longDays, prices[longDays], marker='^', color='green', s=100, label='Long Entry')
+    if shortDays:
+        ax.scatter(shortDays, prices[shortDays], marker='v', color='red', s=100, label='Short Entry')
+    if closeDays:
+        ax.scatter(closeDays, prices[closeDays], marker='o', facecolors='none', edgecolors='blue', s=100,
+                   label='Close Position')
+    ax.set_title(f"{instrument} Price and Trade Markers Over Time")
+    ax.set_xlabel("Day")
+    ax.set_ylabel("Price ($)")
+    ax.legend()
+    fig.tight_layout()
+    return ax
+
+
+def draw_returns(fig, cumulativeReturns, pcPositions, totalValue, dailyReturns, budgetUsed):
+    """
+    Draw the returns dashboard.
+
+    Parameters:
+        cumulativeReturns (dict): Instrument -> cumulative P&L ($) per day.
+        pcPositions (dict): Instrument -> position as % of its limit per day.
+        totalValue (list): Cumulative total P&L ($) per day.
+        dailyReturns (dict): Instrument -> daily P&L ($).
+        budgetUsed (array): Value of the positions held each day.
+
+    Returns:
+        tuple: (plotted lines, legends whose items toggle the lines)
+    """
+    gs = GridSpec(16, 16, figure=fig)
+    # Adjust spacing between subplots
+    fig.subplots_adjust(wspace=10, hspace=10)
+    ax1 = fig.add_subplot(gs[:8, 8:])
+    ax2 = fig.add_subplot(gs[8:12, 8:])
+    ax3 = fig.add_subplot(gs[:8, :8])
+    ax4 = fig.add_subplot(gs[12:, 8:])
+    ax5 = fig.add_subplot(gs[8:, :8])
+    lines = []
+    box = dict(facecolor='white', edgecolor='black', boxstyle='round,pad=0.5')
+    # Plot individual instrument returns, with a point at the final value
+    for instrument, returns in cumulativeReturns.items():
+        line, = ax1.plot(returns, label=instrument)
+        lines.append(line)
+        ax1.scatter(len(returns) - 1, returns[-1], color='red', zorder=5)
+        ax1.annotate(f'{returns[-1]:.2f}', (len(returns) - 1, returns[-1]), textcoords="offset points",
+                     xytext=(0, 10), ha='center', bbox=box)
+    legend1 = ax1.legend()
+    ax1.set_title('Individual Instrument Cumulative P&L ($AUD)')
+    # Plot historical instrument positions
+    for instrument, positions in pcPositions.items():
+        line, = ax4.plot(positions, label=instrument, linewidth=1, alpha=1)
+        lines.append(line)
+    ax4.set_title(r'Historical Instrument Position (% of limit)')
+    # Plot total return history, with a point at the final value
+    line, = ax3.plot(totalValue, label='Total Return', color='black')
+    lines.append(line)
+    ax3.scatter(len(totalValue) - 1, totalValue[-1], color='red', zorder=5)
+    ax3.annotate(f'{totalValue[-1]:.2f}', (len(totalValue) - 1, totalValue[-1]), textcoords="offset points",
+                 xytext=(0, 10), ha='center', bbox=box)
+    legend3 = ax3.legend()
+    ax3.set_title('Cumulative Profit & Loss ($AUD)')
+    # Plot individual instrument historical P&L
+    for instrument, returns in dailyReturns.items():
+        line, = ax2.plot(returns, label=instrument)
+        lines.append(line)
+    ax2.set_title(r'Daily Individual P&L ($AUD)')
+    # Plot daily budget usage graph
+    ax5.plot(budgetUsed, label='Budget Utilisation', color='black')
+    ax5.set_title("Daily Budget Usage ($AUD)")
+    ax5.set_ylim(0, 500_000)
+    return lines, [legend1, legend3]
+
+
+def returns_arrays(engine):
+    # The engine's histories in dollars, as float arrays (plotting does not need Decimals)
+    return dict(
+        cumulativeReturns={instrument: cents / 100 for instrument, cents in engine.cumulativeReturnsCents.items()},
+        pcPositions=engine.pcPositionHistorys,
+        totalValue=engine.totalValueCents / 100,
+        dailyReturns={instrument: cents / 100 for instrument, cents in engine.returnsCents.items()},
+        budgetUsed=engine.pcTotalBudget,
+    )
+
+
+def save_returns(path, arrays, dpi=100):
+    fig = new_figure((16, 9))
+    draw_returns(fig, **arrays)
+    fig.savefig(path, dpi=dpi)
+    return path
+
+
+def save_instrument_details(path, instrument, prices, positionsPc, dpi=100):
+    fig = new_figure((14, 7))
+    draw_instrument_details(fig, instrument, prices, positionsPc)
+    fig.savefig(path, dpi=dpi)
+    return path
+
+
+def _save_instrument_details(job):
+    # Pool entry point, module level so it can be sent to worker processes
+    return save_instrument_details(*job)
+
+
+def instrument_file_name(instrument):
+    return instrument.replace(' ', '_').replace(os.sep, '_') + '.png'
+
+
+def run_summary(engine):
+    """
+    Total and per-instrument PnL, days run, validation counts, risk metrics and trade statistics, as
+    JSON-serializable values.
+    """
+    from metrics import performance_metrics
+    from trade_analytics import trade_analytics
+    return {
+        'totalPNL': str(engine.totalPNL),
+        'days': engine.daysRun,
+        'instrumentReturns': {instrument: str(returns[-1]) if len(returns) else '0'
+                              for instrument, returns in engine.cumulativeReturnsHistory.items()},
+        'daysWithPositionsZeroed': len(engine.validationReports),
+        'metrics': performance_metrics(engine),
+        'trades': trade_analytics(engine),
+    }
+
+
+def write_report(engine, outputDir=None, instruments=(), dpi=100, workers=1, render=True):
+    """
+    Write a run's summary.json, returns_plot.png and one chart per instrument, headless.
+
+    Parameters:
+        engine (TradingEngine): An engine that has been run.
+        outputDir (str): Where to write. Defaults to a new run directory under ./simulation_results.
+        instruments (iterable): Instruments to draw trade-marker charts for.
+        dpi (int): Resolution of the PNG files.
+        workers (int): Processes to render the instrument charts across (-1 for every core).
+        render (bool): False writes only summary.json, e.g. during batch sweeps.
+
+    Returns:
+        str: The output directory.
+    """
+    outputDir = outputDir or run_output_dir()
+    os.makedirs(outputDir, exist_ok=True)
+    with open(os.path.join(outputDir, 'summary.json'), 'w') as file:
+        json.dump(run_summary(engine), file, indent=4)
+    if not render:
+        return outputDir
+    save_returns(os.path.join(outputDir, 'returns_plot.png'), returns_arrays(engine), dpi)
+    positions = engine.pcPositionHistorys
+    jobs = [(os.path.join(outputDir, instrument_file_name(instrument)), instrument,
+             np.asarray(engine.prices[instrument][:engine.daysRun]), positions[instrument], dpi)
+            for instrument in instruments]
+    processes = multiprocessing.cpu_count() if workers == -1 else workers
+    if processes > 1 and len(jobs) > 1:
+        with multiprocessing.Pool(min(processes, len(jobs))) as pool:
+            pool.map(_save_instrument_details, jobs)
+    else:
+        for job in jobs:
+            _save_instrument_details(job)
+    return outputDir
@@ -1,261 +1,371 @@
 # Library Imports
+import copy
 import os
-import pandas as pd
+import sys
+
+import numpy as np
 
 from algorithm import Algorithm
+from price_feed import PriceFeed
+from market_data import MarketData, load_market_data
+from universe import Universe, load_universe_config
+from validation import validate_positions
+from accounting import to_cents_array, cents_to_decimal, cents_list_to_decimal
+from checkpoint import Checkpoint, DAY_ARRAYS, copy_algorithm
+from events import ConsoleSink, DailyPnL, PositionsZeroed, DEBUG, WARNING
 
-import matplotlib.pyplot as plt
 from decimal import Decimal, ROUND_HALF_UP
-from matplotlib.gridspec import GridSpec
 
 ##############################
 # Define constants
 ##############################
-# PRODUCTS AND THEIR INDIVIDUAL BUDGETS IN $AUD
-positionLimits = {
-    "Fintech Token": 35,
-    "Fun Drink": 10000,
-    "Red Pens": 40000,
-    "Thrifted Jeans": 400,
-    "UQ Dollar": 650,
-    "Coffee": 30000,
-    "Coffee Beans": 200,
-    "Goober Eats": 75000,
-    "Milk": 2500
-}
-# TOTAL DAILY BUDGET IN $AUD
-totalDailyBudget = 500000
+# PRODUCTS AND THEIR INDIVIDUAL BUDGETS IN $AUD, and the TOTAL DAILY BUDGET IN $AUD, from universe.json.
+# Engines can be given another config file (e.g. for a larger synthetic universe).
+defaultUniverseConfig = load_universe_config()
+positionLimits = defaultUniverseConfig['positionLimits']
+totalDailyBudget = defaultUniverseConfig['totalDailyBudget']
+# Data folders of the seen (in-sample) and unseen (out-of-sample) splits
+dataSplits = {'seen': './data/seen_data/', 'unseen': './data/unseen_data/'}
+# Days of real history an algorithm is given as padding when backtesting a window of the data
+WARMUP_DAYS = 100
 
 
 ##############################
 
+# The algorithms run_algorithms is running and how far it has got, so a run can be stopped and resumed
+class ActiveRun:
+    def __init__(self, runs, algorithms, feeds, usesFeeds, output_daily_to_CLI, incrementalFeed=True):
+        # Engine holding each algorithm's state (just the engine itself unless a list was run)
+        self.runs = runs
+        self.algorithms = algorithms
+        # Shared price feeds (empty for array algorithms or the legacy list history)
+        self.feeds = feeds
+        self.usesFeeds = usesFeeds
+        self.output_daily_to_CLI = output_daily_to_CLI
+        self.incrementalFeed = incrementalFeed
+        # Next day to run
+        self.day = 0
+
+
 # Trading Engine Class, Controlling Trades Tracking
 class TradingEngine:
-    def __init__(self, dataFolder='./data/'):
+    # Same algorithm and data always give the same results
+    deterministic = True
+
+    def __init__(self, dataFolder='./data/', data=None, universeConfig=None, events=None, days=None):
         # Init variables
         self.dataFolder = dataFolder
-        # Store active positions
+        # (start, stop) to only backtest those days of the data (e.g. one walk-forward window), None for all
+        self.days = days
+        # Sink for the engine's (and its algorithm's) events, by default warnings are printed
+        self.events = events if events is not None else ConsoleSink()
+        # Position Limits and daily budget (from the default universe.json unless a config file is given)
+        config = load_universe_config(universeConfig) if universeConfig else defaultUniverseConfig
+        self.positionLimits = config['positionLimits']
+        self.totalDailyBudget = config['totalDailyBudget']
+        # Store active positions (as returned by the algorithm: a dict, or an array in universe column order)
         self.positions = {}
-        # Position Limits
-        self.positionLimits = positionLimits
-        # Daily return history of each instrument
-        self.returnsHistory = {}
-        # Instrument cumulative returns history
-        self.cumulativeReturnsHistory = {}
-        # Store position as % of limit for graphing
-        self.pcPositionHistorys = {}
-        # Daily return history of combined instruments
-        self.totalReturnHistory = []
-        # Cumulative historical value of combined instruments
-        self.totalValueHistory = []
         # Total days in simulation
         self.totalDays = 0
         # Track total PNL across all instruments
-        self.totalPNL = 0
-        # Track pc of total budget used daily
-        self.pcTotalBudget = []
-        # Setup functions
-        self.load_data()
+        self.totalPNLCents = 0
+        # The run in progress, if any (see run_algorithms and resume_run)
+        self.activeRun = None
+        # Setup functions (a MarketData, or dict of price DataFrames, can be passed in to use instead of dataFolder)
+        self.load_data(data)
         self.initialize_positions()
 
-    # For loading in relevant data from .CSV Files
-    def load_data(self):
-        self.data = {}
-        for file in os.listdir(self.dataFolder):
-            if file.endswith('_price_history.csv'):
-                instrumentName = file.split('_')[0]
-                if instrumentName in positionLimits.keys():
-                    filePath = os.path.join(self.dataFolder, file)
-                    self.data[instrumentName] = pd.read_csv(filePath)
-                else:
-                    print(f"No position limit set for {instrumentName}. This dataset will not be loaded.")
-        # Ensure that all data have same length of days
-        numDays = len(self.data[list(self.data.keys())[0]])
-        for data in self.data.values():
-            # if a dataset has a different number of days, exit
-            if len(data) != numDays:
-                print("\nError, not all datasets are the same length.\bExiting...")
-                exit(1)
-        # Otherwise, all data should have the same number of days.
-        self.totalDays = numDays
-        # print("Datasets loaded successfully.")
-
-    # Set initial positions to 0 for each
+    # For loading in relevant data from .CSV Files.
+    # The parsed prices are shared by every engine in the process until the files change.
+    def load_data(self, data=None):
+        if data is None:
+            data = load_market_data(self.dataFolder, instruments=self.positionLimits, events=self.events)
+        elif not isinstance(data, MarketData):
+            data = MarketData.from_frames(data, dataFolder=self.dataFolder)
+        if self.days is not None:
+            data = data.window(*self.days)
+        self.marketData = data
+        # Read-only float64 price arrays, shared with every other engine using the same data
+        self.prices = data.prices
+        # All data has the same number of days.
+        self.totalDays = data.totalDays
+        # Instruments with a position limit, in the order the data was loaded in, define the state columns
+        self.universe = Universe([instrument for instrument in data.instruments if instrument in self.positionLimits],
+                                 self.positionLimits)
+        # (days x instruments) prices in universe column order
+        if self.universe.instruments == data.instruments:
+            self.priceMatrix = data.matrix
+        else:
+            self.priceMatrix = data.matrix[:, [data.instruments.index(instrument)
+                                               for instrument in self.universe.instruments]]
+
+    # Price history DataFrames (Day, Price) for each instrument
+    @property
+    def data(self):
+        return self.marketData.frames
+
+    # Set initial positions to 0 for each, and allocate the (days x instruments) state arrays
     def initialize_positions(self):
-        for instrument in positionLimits:
-            self.positions[instrument] = 0
-            self.returnsHistory[instrument] = []
-            self.cumulativeReturnsHistory[instrument] = []
-            self.pcPositionHistorys[instrument] = []
-
-    # Helper function to check that a given order is within the daily budget.
-    # Also records the total utilisation of the daily budget.
-    def notWithinBudget(self, desiredPositions, priceHistory):
-        # calc total value of positions
-        totVal = 0
-        for instrument, history in priceHistory.items():
-            pos = desiredPositions[instrument]
-            price = history[-1]
-            value = abs(pos * price)
-            totVal += value
-        # if the budget is exceeded
-        if totVal > totalDailyBudget:
-            print("#########")
-            print(f"Over budget by ${totVal - totalDailyBudget}.")
-            # display values of each instrument position.
-            for instrument, prcHistory in priceHistory.items():
-                pos = desiredPositions[instrument]
-                price = prcHistory[-1]
-                value = abs(pos * price)
-                totVal += value
-                print(f"{instrument} position value: ${value}.")
-            print("#########")
-            # record zero as daily position used of budget, as position will be reset to zero
-            self.pcTotalBudget.append(0)
-            # return true, as desired position not within budget.
-            return True
-        # within daily budget, so record % usage
-        pcBudgetUsage = round(totVal * 100 / totalDailyBudget, 2)
-        self.pcTotalBudget.append(totVal)
-        # return false, as within the daily budget
-        return False
-
-    # Process submitted algorithm
-    def run_algorithms(self, algorithmsInstance, output_daily_to_CLI = True):
+        self.positions = {instrument: 0 for instrument in self.universe.instruments}
+        self.allocate_state()
+
+    def allocate_state(self):
+        universe = self.universe
+        # All PnL is accounted in whole cents (ints), and only converted to Decimal dollars when reported
+        # Final (checked) position held at the end of each day
+        self.positionMatrix = universe.allocate(self.totalDays)
+        # Daily return history of each instrument
+        self.returnsCentsMatrix = universe.allocate(self.totalDays)
+        # Instrument cumulative returns history
+        self.cumulativeReturnsCentsMatrix = universe.allocate(self.totalDays)
+        # Store position as % of limit for graphing
+        self.pcPositionMatrix = universe.allocate(self.totalDays)
+        # Daily return history of combined instruments
+        self.totalReturnCentsArray = np.zeros(self.totalDays, dtype=np.int64)
+        # Cumulative historical value of combined instruments
+        self.totalValueCentsArray = np.zeros(self.totalDays, dtype=np.int64)
+        # Track total value of positions (budget used) each day
+        self.budgetUsedArray = np.zeros(self.totalDays)
+        # Days of the arrays filled in so far
+        self.daysRun = 0
+        # Validation reports of the days where positions were set to zero
+        self.validationReports = []
+        self.totalPNLCents = 0
+
+    # Turn an algorithm's desired positions (dict, or array in universe column order) into an array,
+    # along with a mask of the positions that are not whole numbers (None if they all are)
+    def requested_positions(self, desiredPositions):
+        if isinstance(desiredPositions, np.ndarray):
+            if np.issubdtype(desiredPositions.dtype, np.integer):
+                return desiredPositions.astype(np.int64), None
+            return desiredPositions, np.ones(len(self.universe), dtype=bool)
+        values = [desiredPositions[instrument] for instrument in self.universe.instruments]
+        notInt = [type(value) != type(1) for value in values]
+        if any(notInt):
+            # Anything that is not an int is kept as the original object until it is checked
+            return np.array(values, dtype=object), np.array(notInt)
+        return np.array(values, dtype=np.int64), None
+
+    # Build one append-only feed per instrument over its preloaded price buffer
+    def create_price_feeds(self):
+        return {
+            instrument: PriceFeed(self.prices[instrument])
+            for instrument in self.universe.instruments
+        }
+
+    # Process submitted algorithm.
+    # Algorithms with array_interface = True are given the (day + 1 x instruments) price history matrix,
+    # positions and limits as arrays in universe column order, and return an integer array of positions.
+    # A list of algorithms is run in lockstep over the same data in one pass. Each gets its own engine
+    # (see fork) holding its positions and PnL, and the list of those engines is returned.
+    # With untilDay the run stops before that day, and can be carried on later with resume_run.
+    def run_algorithms(self, algorithmsInstance, output_daily_to_CLI = True, incrementalFeed = True, untilDay = None):
+        batch = isinstance(algorithmsInstance, (list, tuple))
+        algorithms = list(algorithmsInstance) if batch else [algorithmsInstance]
+        runs = [self.fork() for _ in algorithms] if batch else [self]
+        for run, algorithm in zip(runs, algorithms):
+            run.start_run(algorithm)
+        # With the incremental feed the algorithms see the same growing read-only views every day,
+        # otherwise (legacy mode) each day's full history is copied into fresh lists.
+        # Either way the history is built once a day and shared by every algorithm.
+        usesFeeds = any(not run.arrayInterface for run in runs)
+        feeds = self.create_price_feeds() if incrementalFeed and usesFeeds else {}
+        self.activeRun = ActiveRun(runs, algorithms, feeds, usesFeeds, output_daily_to_CLI, incrementalFeed)
+        self.resume_run(untilDay)
+        return runs if batch else None
+
+    # Carry on the run started by run_algorithms, up to (not including) untilDay or to the end of the data
+    def resume_run(self, untilDay=None):
+        active = self.activeRun
+        if active is None:
+            raise RuntimeError("No run to resume, start one with run_algorithms.")
+        instruments = self.universe.instruments
+        prices = self.priceMatrix
+        feeds = active.feeds
+        stop = self.totalDays if untilDay is None else min(untilDay, self.totalDays)
         # Loop through each day of data (leaving the last)
-        for day in range(self.totalDays):
+        for day in range(active.day, stop):
+            currentPrices = prices[day]
             # Get current data history at this point in time
-            historicalData = {}
-            for instrument, priceData in self.data.items():
-                # Fetch all relevant data
-                priceHistory = priceData['Price'][:day + 1].tolist()
-                # Add them to the historicalData store
-                historicalData[instrument] = priceHistory
-                # Update the algorithms instance with the new information
-            algorithmsInstance.day = day
-            algorithmsInstance.data = historicalData
-            algorithmsInstance.positions = self.positions
-            algorithmsInstance.position_limits = self.positionLimits
-            # Now get the desired positions from the competitors algorithm
-            desiredPositions = algorithmsInstance.get_positions()
-
-            # Check if the desired positions are within total budget
-            if self.notWithinBudget(desiredPositions, historicalData):
-                # Set all desired positions to zero
-                for instrument in desiredPositions.keys():
-                    desiredPositions[instrument] = 0
-                print(f"REQUESTED POSIITONS EXCEED DAILY BUDGET OF: ${totalDailyBudget}.")
-                print(f"SET ALL DESIRED POSITIONS FOR DAY {day} TO ZERO.")
-
-            # Store total return for the day
-            dailyReturn = 0
-            # Process profit/loss for each instrument:
-            for instrument, priceData in self.data.items():
-                # Perform desired position quality checks (int and within limits)
-                if (type(desiredPositions[instrument]) != type(1) or  # not an int
-                        abs(desiredPositions[instrument]) > self.positionLimits[instrument]  # not within limits
-                ):
-                    # Incorrect value provided. Skip
-                    print(f"Position given for {instrument} on day {day} invalid.")
-                    print(f"Position given was {desiredPositions[instrument]}.")
-                    print(f"The limit for this instrument today is: {self.positionLimits[instrument]}")
-                    print(f"Setting desired position to zero units.")
-                    # Set zero
-                    desiredPositions[instrument] = 0
-                # Calculate PNL if not day 0
-                if day != 0:
-                    existingPosition = self.positions[instrument]
-                    currPrice = priceData["Price"][day]
-                    lastPrice = priceData["Price"][day - 1]
-                    instrumentPNL = existingPosition * (currPrice - lastPrice)
-                    instrumentPNL = quantize_decimal(instrumentPNL, 2)
-                    self.returnsHistory[instrument].append(instrumentPNL)
-                    self.cumulativeReturnsHistory[instrument].append(
-                        instrumentPNL + self.cumulativeReturnsHistory[instrument][-1]
-                    )
-                    # add it to the daily return
-                    dailyReturn += instrumentPNL
+            if feeds:
+                for feed in feeds.values():
+                    feed.advance()
+                historicalData = feeds
+            elif active.usesFeeds:
+                historicalData = {}
+                for instrument in instruments:
+                    # Fetch all relevant data, and add them to the historicalData store
+                    historicalData[instrument] = self.prices[instrument][:day + 1].tolist()
+            for run, algorithm in zip(active.runs, active.algorithms):
+                data = prices[:day + 1] if run.arrayInterface else historicalData
+                run.run_day(day, algorithm, data, currentPrices, active.output_daily_to_CLI)
+            active.day = day + 1
+
+    # Stop carrying the given engines (from a batch run_algorithms) on when the run is resumed
+    def drop_runs(self, runs):
+        active = self.activeRun
+        dropped = {id(run) for run in runs}
+        kept = [(run, algorithm) for run, algorithm in zip(active.runs, active.algorithms) if id(run) not in dropped]
+        active.runs = [run for run, _ in kept]
+        active.algorithms = [algorithm for _, algorithm in kept]
+
+    # An engine sharing this one's market data, universe and event sink, with its own (empty) run state
+    def fork(self):
+        run = copy.copy(self)
+        run.activeRun = None
+        run.initialize_positions()
+        return run
+
+    # Snapshot of the run so far, to restore or branch from later (see checkpoint.py).
+    # An engine from a batch run (which runs no algorithm of its own) needs to be given its algorithm.
+    def checkpoint(self, algorithmsInstance=None):
+        active = self.activeRun
+        if algorithmsInstance is None:
+            if active is None or len(active.runs) != 1 or active.runs[0] is not self:
+                raise ValueError("This engine is not running a single algorithm, pass the algorithm to checkpoint.")
+            algorithmsInstance = active.algorithms[0]
+        return Checkpoint(
+            self.daysRun,
+            {name: getattr(self, name)[:self.daysRun].copy() for name in DAY_ARRAYS},
+            copy.deepcopy(self.positions),
+            self.totalPNLCents,
+            list(self.validationReports),
+            copy_algorithm(algorithmsInstance),
+            list(self.universe.instruments),
+            self.totalDays,
+            incrementalFeed=active.incrementalFeed if active is not None else True,
+            output_daily_to_CLI=active.output_daily_to_CLI if active is not None else False,
+        )
+
+    # Put the engine back on the day a checkpoint was taken, ready for resume_run.
+    # Returns the (new copy of the) algorithm it is running.
+    def restore(self, checkpoint):
+        if checkpoint.instruments != self.universe.instruments or checkpoint.totalDays != self.totalDays:
+            raise ValueError("The checkpoint was taken on different market data.")
+        algorithmsInstance = checkpoint.new_algorithm()
+        self.start_run(algorithmsInstance)
+        for name, rows in checkpoint.arrays.items():
+            getattr(self, name)[:checkpoint.day] = rows
+        self.daysRun = checkpoint.day
+        self.totalPNLCents = checkpoint.totalPNLCents
+        self.positions = copy.deepcopy(checkpoint.positions)
+        self.validationReports = list(checkpoint.validationReports)
+        feeds = {}
+        if checkpoint.incrementalFeed and not self.arrayInterface:
+            feeds = self.create_price_feeds()
+            for feed in feeds.values():
+                feed.advance(checkpoint.day)
+        self.activeRun = ActiveRun([self], [algorithmsInstance], feeds, not self.arrayInterface,
+                                   checkpoint.output_daily_to_CLI, checkpoint.incrementalFeed)
+        self.activeRun.day = checkpoint.day
+        return algorithmsInstance
+
+    # A new engine carrying on from a checkpoint (by default, from where this engine's run is now)
+    def branch(self, checkpoint=None):
+        checkpoint = checkpoint if checkpoint is not None else self.checkpoint()
+        run = self.fork()
+        run.restore(checkpoint)
+        return run
+
+    # Reset the state arrays and get ready to run an algorithm
+    def start_run(self, algorithmsInstance):
+        self.allocate_state()
+        self.arrayInterface = getattr(algorithmsInstance, 'array_interface', False)
+        if self.arrayInterface:
+            self.positions = np.zeros(len(self.universe), dtype=np.int64)
+        elif self.marketData.start and isinstance(getattr(algorithmsInstance, 'preload_data', None), dict):
+            # Backtesting a window: pad the algorithm's history with the real prices before it
+            # instead of its preloaded ones
+            algorithmsInstance.preload_data = {
+                instrument: self.marketData.warmup[instrument][-WARMUP_DAYS:].tolist()
+                for instrument in self.universe.instruments
+            }
+        # Algorithms (and their strategies) emit into the engine's sink
+        algorithmsInstance.events = self.events
+        # Decide once which events are wanted, so nothing is built for the ones that are not
+        self.emitZeroed = self.events.enabled(WARNING)
+        self.emitDailyPnL = self.events.enabled(DEBUG)
+
+    # Get one day's positions from the algorithm, validate them and account their PnL
+    def run_day(self, day, algorithmsInstance, historicalData, currentPrices, output_daily_to_CLI=True):
+        instruments = self.universe.instruments
+        limits = self.universe.limits
+        # Update the algorithms instance with the new information
+        algorithmsInstance.day = day
+        algorithmsInstance.data = historicalData
+        algorithmsInstance.positions = self.positions
+        algorithmsInstance.position_limits = limits if self.arrayInterface else self.positionLimits
+        # Now get the desired positions from the competitors algorithm
+        desiredPositions = algorithmsInstance.get_positions()
+        requested, notInt = self.requested_positions(desiredPositions)
+
+        # Check the budget, then each position's type and limit, in one pass
+        report = validate_positions(requested, currentPrices, limits, self.totalDailyBudget, notInt, day=day)
+        self.budgetUsedArray[day] = report.budgetUsed
+        positions = report.positions
+        if not report.ok:
+            self.validationReports.append(report)
+            if self.emitZeroed:
+                self.events.emit(PositionsZeroed(report, instruments, limits))
+            # Zero the algorithm's own dict too, as that is what it sees as its positions tomorrow
+            if isinstance(desiredPositions, dict):
+                if report.overBudget:
+                    for instrument in desiredPositions.keys():
+                        desiredPositions[instrument] = 0
                 else:
-                    # No trades executed first day
-                    self.returnsHistory[instrument].append(0)
-                    self.cumulativeReturnsHistory[instrument].append(0)
-            # Store positions in historical tracker for graphing
-            for instrument, desiredPosition in desiredPositions.items():
-                self.pcPositionHistorys[instrument].append(
-                    round(desiredPosition * 100 / self.positionLimits[instrument]))
-            # Add the daily return to the tracker
-            self.totalReturnHistory.append(dailyReturn)
-            # Update total PNL
-            self.totalPNL += dailyReturn
-            # Display PNL
-            if output_daily_to_CLI:
-                print(f"Total PNL @ Day {day}: {self.totalPNL}")
-            # Update total Value
-            self.totalValueHistory.append(self.totalPNL)
-            # Update simluator information
-            self.positions = desiredPositions
-
-    def plot_instrument_details(self, instrument):
+                    for column in np.flatnonzero(report.invalid).tolist():
+                        desiredPositions[instruments[column]] = 0
+        self.positionMatrix[day] = positions
+
+        # Calculate PNL if not day 0 (no trades executed first day)
+        if day != 0:
+            returns = to_cents_array(self.positionMatrix[day - 1] * (currentPrices - self.priceMatrix[day - 1]))
+            self.returnsCentsMatrix[day] = returns
+            self.cumulativeReturnsCentsMatrix[day] = self.cumulativeReturnsCentsMatrix[day - 1] + returns
+            dailyReturn = int(returns.sum())
+        else:
+            dailyReturn = 0
+        # Store positions in historical tracker for graphing
+        self.pcPositionMatrix[day] = np.rint(positions * 100 / limits)
+        # Add the daily return to the tracker
+        self.totalReturnCentsArray[day] = dailyReturn
+        # Update total PNL
+        self.totalPNLCents += dailyReturn
+        # Display PNL
+        if self.emitDailyPnL:
+            self.events.emit(DailyPnL(day, self.totalPNLCents))
+        if output_daily_to_CLI:
+            print(f"Total PNL @ Day {day}: {cents_to_decimal(self.totalPNLCents)}")
+        # Update total Value
+        self.totalValueCentsArray[day] = self.totalPNLCents
+        self.daysRun = day + 1
+        # Update simluator information
+        self.positions = desiredPositions if isinstance(desiredPositions, dict) else positions
+
+    # Prices and trade markers of one instrument. Shown in an interactive window, or with show=False drawn
+    # headless (Agg) and only saved to outputDir.
+    def plot_instrument_details(self, instrument, outputDir=None, dpi=100, show=True):
+        # matplotlib is only imported once something is plotted
+        import reporting
         # Verify that the instrument's data is loaded.
         if instrument not in self.data:
             print(f"Instrument {instrument} data not found.")
             return
-
-        # Retrieve price data and position history.
-        prices = self.data[instrument]['Price']
+        prices = self.prices[instrument][:self.daysRun]
         positions_pc = self.pcPositionHistorys[instrument]  # Position size in % of limit.
+        if not show:
+            if outputDir is not None:
+                os.makedirs(outputDir, exist_ok=True)
+                path = os.path.join(outputDir, reporting.instrument_file_name(instrument))
+                reporting.save_instrument_details(path, instrument, prices, positions_pc, dpi)
+            return
 
-        # Initialize lists to hold day indices for trade events.
-        long_days = []
-        short_days = []
-        close_days = []
-
-        # Determine trade events by comparing consecutive days:
-        # - Long entry: from 0 to positive.
-        # - Short entry: from 0 to negative.
-        # - Close: from non-zero to 0.
-        # Also treat sign changes as a close and new entry.
-        prev = 0
-        for day, pos in enumerate(positions_pc):
-            if day == 0:
-                prev = pos
-                continue
-            if prev == 0 and pos > 0:
-                long_days.append(day)
-            elif prev == 0 and pos < 0:
-                short_days.append(day)
-            elif prev != 0 and pos == 0:
-                close_days.append(day)
-            elif prev > 0 and pos < 0:
-                close_days.append(day)
-                short_days.append(day)
-            elif prev < 0 and pos > 0:
-                close_days.append(day)
-                long_days.append(day)
-            prev = pos
-
-        # Create a single figure and axis.
-        fig, ax = plt.subplots(figsize=(14, 7))
-
-        # Plot the price data.
-        ax.plot(prices, label=f'{instrument} Price', color='black')
-
-        # Add scatter plots for trade markers.
-        if long_days:
-            ax.scatter(long_days, prices.iloc[long_days], marker='^', color='green',
-                       s=100, label='Long Entry')
-        if short_days:
-            ax.scatter(short_days, prices.iloc[short_days], marker='v', color='red',
-                       s=100, label='Short Entry')
-        if close_days:
-            ax.scatter(close_days, prices.iloc[close_days], marker='o', facecolors='none',
-                       edgecolors='blue', s=100, label='Close Position')
-
-        ax.set_title(f"{instrument} Price and Trade Markers Over Time")
-        ax.set_xlabel("Day")
-        ax.set_ylabel("Price ($)")
-        ax.legend()
-        plt.tight_layout()
+        import matplotlib.pyplot as plt
+        fig = reporting.new_figure((14, 7), headless=False)
+        ax = reporting.draw_instrument_details(fig, instrument, prices, positions_pc)
+        if outputDir is not None:
+            os.makedirs(outputDir, exist_ok=True)
+            fig.savefig(os.path.join(outputDir, reporting.instrument_file_name(instrument)), dpi=dpi)
 
         # Add the built-in cursor widget (crosshair) from matplotlib.widgets.
         from matplotlib.widgets import Cursor
@@ -286,17 +396,16 @@ class TradingEngine:
 
         plt.show()
 
-    def plot_returns(self):
-        # Set figure size
-        fig = plt.figure(figsize=(16, 9))
-        gs = GridSpec(16, 16, figure=fig)
-        # Adjust spacing between subplots
-        fig.subplots_adjust(wspace=10, hspace=10)
-        ax1 = fig.add_subplot(gs[:8, 8:])
-        ax2 = fig.add_subplot(gs[8:12, 8:])
-        ax3 = fig.add_subplot(gs[:8, :8])
-        ax4 = fig.add_subplot(gs[12:, 8:])
-        ax5 = fig.add_subplot(gs[8:, :8])
+    # Returns dashboard, saved to outputDir (None to not save) at dpi. With show=False it is drawn
+    # headless (Agg) and nothing is printed or shown.
+    def plot_returns(self, outputDir='./simulation_results', dpi=300, show=True):
+        import reporting
+        arrays = reporting.returns_arrays(self)
+        if not show:
+            if outputDir is not None:
+                os.makedirs(outputDir, exist_ok=True)
+                reporting.save_returns(os.path.join(outputDir, 'returns_plot.png'), arrays, dpi)
+            return
         # Print metrics
         print('#' * 50)
         print(f"Total PNL ($): {self.totalPNL}")
@@ -305,41 +414,18 @@ class TradingEngine:
             instrumentReturn = returns[-1]
             print(f"{instrument} Returns ($): {instrumentReturn}")
         print('#' * 50)
-        # Store the lines for toggling visibility
-        lines = []
-        # Plot individual instrument returns
-        for instrument, returns in self.cumulativeReturnsHistory.items():
-            line, = ax1.plot(returns, label=instrument)
-            lines.append(line)
-            # Plot the point at the final value
-            ax1.scatter(len(returns) - 1, returns[-1], color='red', zorder=5)
-            ax1.annotate(f'{returns[-1]:.2f}', (len(returns) - 1, returns[-1]), textcoords="offset points", xytext=(0, 10), ha='center', bbox=dict(facecolor='white', edgecolor='black', boxstyle='round,pad=0.5'))
-        legend1 = ax1.legend()
-        ax1.set_title('Individual Instrument Cumulative P&L ($AUD)')
-        # Plot historical instrument positions
-        for instrument, returns in self.pcPositionHistorys.items():
-            line, = ax4.plot(returns, label=instrument, linewidth=1, alpha=1)
-            lines.append(line)
-        ax4.set_title(r'Historical Instrument Position (% of limit)')
-        # Plot total return history
-        line, = ax3.plot(self.totalValueHistory, label='Total Return', color='black')
-        lines.append(line)
-        # Plot a point at the final value of total return
-        ax3.scatter(len(self.totalValueHistory) - 1, self.totalValueHistory[-1], color='red', zorder=5)
-        ax3.annotate(f'{self.totalValueHistory[-1]:.2f}', (len(self.totalValueHistory) - 1, self.totalValueHistory[-1]),
-                     textcoords="offset points", xytext=(0, 10), ha='center',
-                     bbox=dict(facecolor='white', edgecolor='black', boxstyle='round,pad=0.5'))
-        legend3 = ax3.legend()
-        ax3.set_title('Cumulative Profit & Loss ($AUD)')
-        # Plot individual instrument historical P&L
-        for instrument, returns in self.returnsHistory.items():
-            line, = ax2.plot(returns, label=instrument)
-            lines.append(line)
-        ax2.set_title(r'Daily Individual P&L ($AUD)')
-        # Plot daily budget usage graph
-        line, = ax5.plot(self.pcTotalBudget, label='Budget Utilisation', color='black')
-        ax5.set_title("Daily Budget Usage ($AUD)")
-        ax5.set_ylim(0, 500_000)
+        performance = self.performance_metrics()
+        total, budget = performance["total"], performance["budget"]
+        for label, name in (("Sharpe", "sharpe"), ("Sortino", "sortino"), ("Calmar", "calmar"),
+                            ("Max Drawdown ($)", "max_drawdown"), ("Max Drawdown (days)", "max_drawdown_days"),
+                            ("Volatility ($, annualised)", "volatility")):
+            value = total[name]
+            print(f"{label}: {value:.2f}" if isinstance(value, float) else f"{label}: {value}")
+        print(f"Budget Used: mean {budget['mean']:.1%}, max {budget['max']:.1%}")
+        print('#' * 50)
+        import matplotlib.pyplot as plt
+        fig = reporting.new_figure((16, 9), headless=False)
+        lines, legends = reporting.draw_returns(fig, **arrays)
 
         # Handle picking legend options
         def on_pick(event):
@@ -354,18 +440,82 @@ class TradingEngine:
             fig.canvas.draw()
 
         # Enable picking on legend items
-        for legend in [legend1, legend3]:
+        for legend in legends:
             for legend_item in legend.get_lines():
                 legend_item.set_picker(True)
         # Connect the pick event
         fig.canvas.mpl_connect('pick_event', on_pick)
         # Save the figure
-        output_dir = './simulation_results'
-        os.makedirs(output_dir, exist_ok=True)
-        fig.savefig(os.path.join(output_dir, 'returns_plot.png'), dpi=300)
+        if outputDir is not None:
+            os.makedirs(outputDir, exist_ok=True)
+            fig.savefig(os.path.join(outputDir, 'returns_plot.png'), dpi=dpi)
         plt.show()
         plt.close(fig)
 
+    # Headless summary.json and charts in a per-run output directory (see reporting.write_report)
+    def write_report(self, outputDir=None, instruments=(), dpi=100, workers=1, render=True):
+        import reporting
+        return reporting.write_report(self, outputDir=outputDir, instruments=instruments, dpi=dpi,
+                                      workers=workers, render=render)
+
+    # Round-trip win rate, holding period, exit prices, EV error and turnover of every instrument
+    # (see trade_analytics.trade_analytics)
+    def trade_analytics(self, expectedExit=None, instruments=None):
+        import trade_analytics
+        return trade_analytics.trade_analytics(self, expectedExit=expectedExit, instruments=instruments)
+
+    # Sharpe, Sortino, drawdown, Calmar, rolling volatility, exposure and budget use (see metrics.performance_metrics)
+    def performance_metrics(self, periodsPerYear=None, rollingWindow=None):
+        import metrics
+        return metrics.performance_metrics(self, periodsPerYear=periodsPerYear or metrics.PERIODS_PER_YEAR,
+                                           rollingWindow=rollingWindow or metrics.ROLLING_WINDOW)
+
+    # Per-instrument (name -> array) and combined views of the state arrays, over the days run so far
+    @property
+    def returnsCents(self):
+        return self.universe.columns(self.returnsCentsMatrix[:self.daysRun])
+
+    @property
+    def cumulativeReturnsCents(self):
+        return self.universe.columns(self.cumulativeReturnsCentsMatrix[:self.daysRun])
+
+    @property
+    def pcPositionHistorys(self):
+        return self.universe.columns(self.pcPositionMatrix[:self.daysRun])
+
+    @property
+    def totalReturnCents(self):
+        return self.totalReturnCentsArray[:self.daysRun]
+
+    @property
+    def totalValueCents(self):
+        return self.totalValueCentsArray[:self.daysRun]
+
+    @property
+    def pcTotalBudget(self):
+        return self.budgetUsedArray[:self.daysRun]
+
+    # Reporting views of the cent-based accounting, in Decimal dollars
+    @property
+    def totalPNL(self):
+        return cents_to_decimal(self.totalPNLCents)
+
+    @property
+    def returnsHistory(self):
+        return {instrument: cents_list_to_decimal(cents) for instrument, cents in self.returnsCents.items()}
+
+    @property
+    def cumulativeReturnsHistory(self):
+        return {instrument: cents_list_to_decimal(cents) for instrument, cents in self.cumulativeReturnsCents.items()}
+
+    @property
+    def totalReturnHistory(self):
+        return cents_list_to_decimal(self.totalReturnCents)
+
+    @property
+    def totalValueHistory(self):
+        return cents_list_to_decimal(self.totalValueCents)
+
     def get_total_PnL(self) -> float:
         return self.totalPNL
 
@@ -381,10 +531,10 @@ def quantize_decimal(value, decimal_places=2):
 
 if __name__ == "__main__":
 
-    # Uncomment one or the other to control if we use seen or unseen data
-    # dataFolder = './data/seen_data/'
-    dataFolder = './data/unseen_data/'
-
+    # Seen or unseen data (or any data folder) can be given on the command line, unseen by default:
+    #   python simulation.py seen
+    split = sys.argv[1] if len(sys.argv) > 1 else 'unseen'
+    dataFolder = dataSplits.get(split, split)
 
     engine = TradingEngine(
         dataFolder=dataFolder,
@@ -0,0 +1,186 @@
+"""
+Per-instrument trading strategies for Algorithm.
+
+Each instrument is traded by one Strategy object, built once with the algorithm. It reads its parameters
+from the algorithm's config for that instrument (DEFAULT_CONFIG merged with any overrides, read at
+evaluation time so later config changes apply). It declares what it depends on:
+
+    inputs   instruments whose prices it reads (its own by default)
+    windows  the history window lengths it reads, so history buffers can be sized up front
+    every    a schedule, in days, to also evaluate it on without new prices (e.g. for time-based exits),
+             None to only evaluate it when its inputs change
+
+and which config keys it reads (`parameters`), so a sweep or search can reject keys that would do nothing.
+
+Algorithm.get_positions only evaluates a strategy when one of its inputs has a new price, or it is due on
+its schedule. Otherwise it holds its current position. Strategies are registered by class name,
+so an algorithm can be given e.g. strategies={"Fintech Token": "SMACrossover"}.
+"""
+from utils.tools import ema_indicator, sma_indicator, RollingEMA
+
+# Strategy classes by name
+STRATEGIES = {}
+
+# Prices this close to a band edge of the streaming EMA (which is only exact to float rounding, about 1e-13
+# here) are compared against the batch EMA instead, so near-ties trade exactly as they always have
+TIE_TOLERANCE = 1e-9
+
+
+def register(cls):
+    STRATEGIES[cls.__name__] = cls
+    return cls
+
+
+def strategy_class(strategy):
+    # A Strategy class, or the name of a registered one
+    if isinstance(strategy, str):
+        if strategy not in STRATEGIES:
+            raise KeyError(f"No strategy named {strategy!r}, registered: {', '.join(STRATEGIES)}.")
+        return STRATEGIES[strategy]
+    return strategy
+
+
+def strictly_increasing(price_history, days: int) -> bool:
+    if len(price_history) < days:
+        return False
+    subset = price_history[-days:]
+    return all(earlier < later for earlier, later in zip(subset, subset[1:]))
+
+
+def strictly_decreasing(price_history, days: int) -> bool:
+    if len(price_history) < days:
+        return False
+    subset = price_history[-days:]
+    return all(earlier > later for earlier, later in zip(subset, subset[1:]))
+
+
+class Strategy:
+    # Also evaluate every `every` days, whether or not the inputs changed (None: only when they change)
+    every = None
+    # Config keys the strategy reads
+    parameters = ()
+
+    def __init__(self, algo, instrument, params):
+        """
+        Parameters:
+            algo: The algorithm this strategy trades for (provides data, day, indicators, ...).
+            instrument (str): The instrument it trades.
+            params (dict): Its parameters (the algorithm's config for the instrument).
+        """
+        self.algo = algo
+        self.instrument = instrument
+        self.params = params
+
+    @property
+    def inputs(self):
+        return (self.instrument,)
+
+    @property
+    def windows(self):
+        return ()
+
+    def position(self, current_position, limit):
+        """The desired position, given the current position and the position limit."""
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.instrument!r})"
+
+
+@register
+class ThresholdReversion(Strategy):
+    # Long below lower_bound, short above upper_bound, otherwise hold (trade_size units, the limit if not set)
+    parameters = ("lower_bound", "upper_bound", "trade_size")
+
+    def position(self, current_position, limit):
+        price = self.algo.get_current_price(self.instrument)
+        size = self.params.get("trade_size", limit)
+        if price < self.params["lower_bound"]:
+            return size
+        elif price > self.params["upper_bound"]:
+            return -size
+        return current_position
+
+
+@register
+class EMAReversion(Strategy):
+    # Long when the price is more than `threshold` under its EMA, short when over, otherwise hold
+    parameters = ("ema_window", "threshold")
+
+    @property
+    def windows(self):
+        return (self.params["ema_window"],)
+
+    def position(self, current_position, limit):
+        price = self.algo.get_current_price(self.instrument)
+        ema = self.algo.get_streaming_indicator(self.instrument, RollingEMA, self.params["ema_window"]).value
+        threshold = self.params.get("threshold", 0)
+        # Settle near-ties with the batch EMA (O(window), and only on those days)
+        if min(abs(price - (ema - threshold)), abs(price - (ema + threshold))) <= TIE_TOLERANCE:
+            window = self.params["ema_window"]
+            ema = ema_indicator(self.algo.get_recent_history(self.instrument, window), window)
+        if price < ema - threshold:
+            return limit
+        elif price > ema + threshold:
+            return -limit
+        return current_position
+
+
+@register
+class EMAMomentum(EMAReversion):
+    # EMA reversion, overridden by momentum after momentum_days of strictly rising (or falling) actual prices
+    parameters = EMAReversion.parameters + ("momentum_days",)
+
+    @property
+    def windows(self):
+        return (self.params["ema_window"], self.params["momentum_days"])
+
+    def position(self, current_position, limit):
+        desired = super().position(current_position, limit)
+        # Use actual (unpadded) data for the momentum check.
+        history = self.algo.data[self.instrument]
+        if strictly_increasing(history, self.params["momentum_days"]):
+            return limit
+        elif strictly_decreasing(history, self.params["momentum_days"]):
+            return -limit
+        return desired
+
+
+@register
+class SMACrossover(Strategy):
+    # Long (short) when the short SMA is more than difference_threshold over (under) the long SMA
+    parameters = ("sma_short_days", "sma_long_days", "difference_threshold")
+
+    @property
+    def windows(self):
+        return (self.params["sma_short_days"], self.params["sma_long_days"])
+
+    def position(self, current_position, limit):
+        params = self.params
+        sma_short = sma_indicator(self.algo.get_recent_history(self.instrument, params["sma_short_days"]),
+                                  params["sma_short_days"])
+        sma_long = sma_indicator(self.algo.get_recent_history(self.instrument, params["sma_long_days"]),
+                                 params["sma_long_days"])
+        difference = abs(sma_short - sma_long)
+        if self.algo.day <= 2:
+            return 0
+        if sma_short > sma_long and difference > params["difference_threshold"]:
+            return limit
+        elif sma_short < sma_long and difference > params["difference_threshold"]:
+            return -limit
+        return limit
+
+
+@register
+class UQDollarTrades(Strategy):
+    # trading_classes.UQDollarStrategy, which also keeps a ledger of its trades on the algorithm
+    parameters = ("trade_size", "exit_condition")
+
+    def __init__(self, algo, instrument, params):
+        super().__init__(algo, instrument, params)
+        from trading_classes import UQDollarStrategy
+        self.strategy = UQDollarStrategy(algo, trade_size=params.get("trade_size", 650),
+                                         exit_condition=params.get("exit_condition", 100))
+
+    def position(self, current_position, limit):
+        return self.strategy.evaluate().position
@@ -0,0 +1,188 @@
+"""
+Round-trip trade analytics of a TradingEngine run.
+
+A round trip is a run of days over which an instrument's position keeps the same sign. It opens on the day
+the position leaves zero (or flips sign) and closes on the day it goes back to zero (or flips), which are
+the transitions reporting.trade_markers marks. Changes of size within a trip are part of it. A trip still
+open on the last day run is valued at that day's price and flagged as open.
+
+Every instrument's trips are found at once from the engine's (days x instruments) position and price
+arrays, and the statistics are grouped per instrument with bincounts and one sort, so nothing loops over
+days or trades in Python, whatever the length of the run:
+
+    engine.run_algorithms(algo, output_daily_to_CLI=False)
+    stats = engine.trade_analytics(expectedExit={"UQ Dollar": 100})
+    stats["UQ Dollar"]["win_rate"], stats["UQ Dollar"]["long_exit_quantiles"]
+"""
+import numpy as np
+
+# Quantiles of the exit prices reported per instrument
+EXIT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def round_trips(positions, prices, cumulativeCents):
+    """
+    Every instrument's round trips.
+
+    Parameters:
+        positions (np.ndarray): (days x instruments) positions.
+        prices (np.ndarray): (days x instruments) prices.
+        cumulativeCents (np.ndarray): (days x instruments) cumulative PnL in cents.
+
+    Returns:
+        dict: Column -> array with one entry per trip, ordered by instrument then entry day: "instrument"
+        (column index), "entry_day", "exit_day", "entry_price", "exit_price", "position" (at entry),
+        "pnl" ($, from the engine's accounting, so changes of size are included) and "open".
+    """
+    positions = np.asarray(positions)
+    days, columns = positions.shape
+    sign = np.sign(positions)
+    flat = np.zeros((1, columns), dtype=sign.dtype)
+    before = np.vstack([flat, sign[:-1]])
+    after = np.vstack([sign[1:], flat])
+    # Transposed, so nonzero() orders the trips by instrument, then day
+    instrument, entryDay = np.nonzero(((sign != 0) & (sign != before)).T)
+    _, lastDay = np.nonzero(((sign != 0) & (sign != after)).T)
+    # The position is closed on the day after the trip's last day, if there is one
+    isOpen = lastDay == days - 1
+    exitDay = np.where(isOpen, lastDay, lastDay + 1)
+    cumulativeCents = np.asarray(cumulativeCents)
+    pnlCents = cumulativeCents[exitDay, instrument] - cumulativeCents[entryDay, instrument]
+    return {
+        "instrument": instrument,
+        "entry_day": entryDay,
+        "exit_day": exitDay,
+        "entry_price": np.asarray(prices)[entryDay, instrument],
+        "exit_price": np.asarray(prices)[exitDay, instrument],
+        "position": positions[entryDay, instrument],
+        "pnl": pnlCents / 100,
+        "open": isOpen,
+    }
+
+
+def ev_accuracy(expected, realised):
+    """
+    Per trade, 100 minus the expected value's percentage error against the realised value. When the realised
+    value is 0, it is 100 if the expected value is also 0, otherwise 0.
+    """
+    expected = np.asarray(expected, dtype=float)
+    realised = np.asarray(realised, dtype=float)
+    nonzero = realised != 0
+    accuracy = np.where(expected == 0, 100.0, 0.0)
+    accuracy[nonzero] = 100 - np.abs(expected[nonzero] - realised[nonzero]) / np.abs(realised[nonzero]) * 100
+    return accuracy
+
+
+def grouped_mean(values, groups, count):
+    """Mean of values per group (nan for empty groups)."""
+    sizes = np.bincount(groups, minlength=count)
+    sums = np.bincount(groups, weights=values, minlength=count)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / sizes
+
+
+def grouped_quantiles(values, groups, count, quantiles=EXIT_QUANTILES):
+    """(count x quantiles) linearly interpolated quantiles of values per group (nan for empty groups)."""
+    order = np.lexsort((values, groups))
+    ordered = np.asarray(values, dtype=float)[order]
+    sizes = np.bincount(groups, minlength=count)
+    starts = np.cumsum(sizes) - sizes
+    position = np.maximum(sizes - 1, 0)[:, None] * np.asarray(quantiles)[None, :]
+    low = np.floor(position).astype(np.int64)
+    high = np.ceil(position).astype(np.int64)
+    result = np.full(position.shape, np.nan)
+    filled = sizes > 0
+    if len(ordered):
+        lowValues = ordered[np.minimum(starts[:, None] + low, len(ordered) - 1)]
+        highValues = ordered[np.minimum(starts[:, None] + high, len(ordered) - 1)]
+        interpolated = lowValues + (highValues - lowValues) * (position - low)
+        result[filled] = interpolated[filled]
+    return result
+
+
+def turnover(positions, prices):
+    """Dollar value traded per instrument (as a column array), starting from no position."""
+    traded = np.abs(np.diff(np.asarray(positions), axis=0, prepend=0))
+    return (traded * np.asarray(prices)).sum(axis=0)
+
+
+def trade_statistics(trips, positions, prices, expectedExit=None):
+    """
+    Per-instrument statistics of round trips (see round_trips), as arrays with one entry per instrument.
+
+    Win rate, PnL, holding period, exit prices and EV errors are over the closed trips only.
+
+    Parameters:
+        trips (dict): Round trips of the run.
+        positions, prices (np.ndarray): The run's (days x instruments) positions and prices.
+        expectedExit (np.ndarray): Expected exit price per instrument (nan where there is none). A trip's
+        expected value is (expected exit - entry price) * position at entry.
+
+    Returns:
+        dict: Statistic -> array (or (instruments x quantiles) array for the exit quantiles).
+    """
+    count = np.asarray(positions).shape[1]
+    closed = ~trips["open"]
+    group = trips["instrument"][closed]
+    pnl = trips["pnl"][closed]
+    exitPrice = trips["exit_price"][closed]
+    long = trips["position"][closed] > 0
+    stats = {
+        "trades": np.bincount(trips["instrument"], minlength=count),
+        "closed_trades": np.bincount(group, minlength=count),
+        "open_trades": np.bincount(trips["instrument"][~closed], minlength=count),
+        "win_rate": grouped_mean((pnl > 0).astype(float), group, count),
+        "total_pnl": np.bincount(group, weights=pnl, minlength=count),
+        "avg_pnl": grouped_mean(pnl, group, count),
+        # Unrealised PnL of the open trips, so total_pnl + open_pnl is the instrument's PnL
+        "open_pnl": np.bincount(trips["instrument"][~closed], weights=trips["pnl"][~closed], minlength=count),
+        "avg_holding_days": grouped_mean((trips["exit_day"] - trips["entry_day"])[closed], group, count),
+        "avg_long_exit": grouped_mean(exitPrice[long], group[long], count),
+        "avg_short_exit": grouped_mean(exitPrice[~long], group[~long], count),
+        "long_exit_quantiles": grouped_quantiles(exitPrice[long], group[long], count),
+        "short_exit_quantiles": grouped_quantiles(exitPrice[~long], group[~long], count),
+        "turnover": turnover(positions, prices),
+    }
+    if expectedExit is not None:
+        expected = (np.asarray(expectedExit, dtype=float)[group] - trips["entry_price"][closed]) \
+            * trips["position"][closed]
+        rated = ~np.isnan(expected)
+        stats["ev_mean_abs_error"] = grouped_mean(np.abs(expected - pnl)[rated], group[rated], count)
+        stats["ev_accuracy"] = grouped_mean(ev_accuracy(expected[rated], pnl[rated]), group[rated], count)
+    return stats
+
+
+def _plain(value):
+    # JSON-serializable Python value, with nan as None
+    if isinstance(value, np.ndarray):
+        return [_plain(item) for item in value.tolist()]
+    value = value.item() if isinstance(value, np.generic) else value
+    return None if isinstance(value, float) and np.isnan(value) else value
+
+
+def trade_analytics(engine, expectedExit=None, instruments=None):
+    """
+    Round-trip statistics of every instrument of a run, over the days run so far.
+
+    Parameters:
+        engine (TradingEngine): An engine that has been run.
+        expectedExit (dict): Instrument -> expected exit price, for the EV error statistics.
+        instruments (iterable): Instruments to report, all of the universe's if None.
+
+    Returns:
+        dict: Instrument -> {statistic -> value}, JSON-serializable (nan as None).
+    """
+    universe = engine.universe
+    days = engine.daysRun
+    positions = engine.positionMatrix[:days]
+    prices = engine.priceMatrix[:days]
+    trips = round_trips(positions, prices, engine.cumulativeReturnsCentsMatrix[:days])
+    expected = universe.to_row(expectedExit, default=np.nan).astype(float) if expectedExit is not None else None
+    stats = trade_statistics(trips, positions, prices, expected)
+    stats["exit_quantiles"] = np.asarray(EXIT_QUANTILES)
+    report = {}
+    for instrument in (universe.instruments if instruments is None else instruments):
+        column = universe.index[instrument]
+        report[instrument] = {name: _plain(values if name == "exit_quantiles" else values[column])
+                              for name, values in stats.items()}
+    return report
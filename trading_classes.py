@@ -1,5 +1,146 @@
+import numpy as np
+
+from events import NULL_SINK, TradeOpened, TradeClosed, TradeEV, INFO, DEBUG
+
+# Ledger columns and their types, one row per trade (exit columns are -1 / nan while a trade is open)
+LEDGER_COLUMNS = {
+    "entry_day": np.int64,
+    "exit_day": np.int64,
+    "entry_price": np.float64,
+    "exit_price": np.float64,
+    "position": np.int64,
+    "realised_value": np.float64,
+    # Offsets of the trade's price and EV paths in the ledger's shared path arrays
+    "price_start": np.int64,
+    "price_count": np.int64,
+    "ev_start": np.int64,
+    "ev_count": np.int64,
+}
+
+
+def _grown(array, needed):
+    # The array, or a copy of it with at least `needed` rows (doubling, so appends are amortised O(1))
+    if needed <= len(array):
+        return array
+    larger = np.empty(max(needed, 2 * len(array)), dtype=array.dtype)
+    larger[:len(array)] = array
+    return larger
+
+
+def _read_only(view):
+    view.flags.writeable = False
+    return view
+
+
+class TradeLedger:
+    def __init__(self, asset, capacity=64, path_capacity=1024):
+        """
+        Columnar ledger of an asset's trades (open and closed).
+
+        Each trade is a row of preallocated column arrays, grown by doubling. Its daily price and EV paths
+        are stored as offsets into two arrays shared by every trade, which are appended to while it is the
+        ledger's latest trade. Trades are handles onto a row, so nothing is built per trade or per day until
+        a summary is asked for. Columns can be read as arrays, e.g. ledger.exit_price[ledger.closed].
+
+        Parameters:
+            asset (str): The asset symbol.
+            capacity (int): Trades to allocate room for up front.
+            path_capacity (int): Path entries (days held, summed over trades) to allocate room for up front.
+        """
+        self.asset = asset
+        self.count = 0
+        self.columns = {name: np.empty(max(capacity, 1), dtype=dtype) for name, dtype in LEDGER_COLUMNS.items()}
+        self.prices = np.empty(max(path_capacity, 1))
+        self.evs = np.empty(max(path_capacity, 1))
+        self.prices_used = 0
+        self.evs_used = 0
+
+    def __getattr__(self, name):
+        # ledger.entry_price, ledger.realised_value, ...: the filled rows of a column
+        columns = self.__dict__.get("columns", {})
+        if name in columns:
+            return _read_only(columns[name][:self.count])
+        raise AttributeError(name)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if not -self.count <= index < self.count:
+            raise IndexError(f"Trade {index} out of range for a ledger of {self.count} trades.")
+        return Trade.at(self, index % self.count)
+
+    def __iter__(self):
+        return (Trade.at(self, index) for index in range(self.count))
+
+    @property
+    def closed(self):
+        """Boolean mask of the closed trades."""
+        return self.columns["exit_day"][:self.count] >= 0
+
+    def open(self, entry_day, entry_price, position):
+        """Record a new trade, with entry_price as the first price on its path, and return it."""
+        return Trade(self.asset, entry_day, entry_price, position, ledger=self)
+
+    def append_row(self, entry_day, entry_price, position):
+        index = self.count
+        if index == len(self.columns["entry_day"]):
+            self.columns = {name: _grown(column, index + 1) for name, column in self.columns.items()}
+        row = {"entry_day": entry_day, "exit_day": -1, "entry_price": entry_price, "exit_price": np.nan,
+               "position": position, "realised_value": np.nan, "price_start": self.prices_used,
+               "price_count": 0, "ev_start": self.evs_used, "ev_count": 0}
+        for name, value in row.items():
+            self.columns[name][index] = value
+        self.count += 1
+        self.append_price(index, entry_price)
+        return index
+
+    def _check_latest(self, index):
+        if index != self.count - 1:
+            raise ValueError(f"Only the latest trade of the {self.asset} ledger can be added to "
+                             f"(trade {index} of {self.count}).")
+
+    def append_price(self, index, price):
+        self._check_latest(index)
+        self.prices = _grown(self.prices, self.prices_used + 1)
+        self.prices[self.prices_used] = price
+        self.prices_used += 1
+        self.columns["price_count"][index] += 1
+
+    def append_ev(self, index, ev):
+        self._check_latest(index)
+        self.evs = _grown(self.evs, self.evs_used + 1)
+        self.evs[self.evs_used] = ev
+        self.evs_used += 1
+        self.columns["ev_count"][index] += 1
+
+    def price_path(self, index):
+        """The trade's recorded prices, as a read-only view."""
+        start = self.columns["price_start"][index]
+        return _read_only(self.prices[start:start + self.columns["price_count"][index]])
+
+    def ev_path(self, index):
+        """The trade's recorded expected values, as a read-only view."""
+        start = self.columns["ev_start"][index]
+        return _read_only(self.evs[start:start + self.columns["ev_count"][index]])
+
+    def expected_values(self, exit_condition):
+        """Expected value of every trade (see Trade.calculate_expected_value)."""
+        avg_long_exit = 100
+        avg_short_exit = 100
+        position = self.position
+        dynamic_exit = np.where(position > 0, avg_long_exit, avg_short_exit)
+        return (dynamic_exit - self.entry_price) * position
+
+    def __repr__(self):
+        return f"TradeLedger({self.asset!r}, {self.count} trades, {int(self.closed.sum())} closed)"
+
+
 class Trade:
-    def __init__(self, asset, entry_day, entry_price, position):
+    # A handle onto one row of a TradeLedger
+    __slots__ = ("ledger", "index")
+
+    def __init__(self, asset, entry_day, entry_price, position, ledger=None):
         """
         Initialize a new trade.
 
@@ -8,41 +149,87 @@ class Trade:
             entry_day (int): The day the trade was initiated.
             entry_price (float): The entry price.
             position (int): The size of the position (positive for long, negative for short).
+            ledger (TradeLedger): The ledger to record it in (a new one of its own if None).
         """
-        self.asset = asset
-        self.entry_day = entry_day
-        self.entry_price = entry_price
-        self.position = position
-        self.exit_day = None
-        self.exit_price = None
-        self.realised_value = None
-        self.cost_to_hold = abs(entry_price * position)
-        self.position_prices = [entry_price]
-        self.ev_history = []  # Record of expected values while the trade is open
+        self.ledger = ledger if ledger is not None else TradeLedger(asset, capacity=1, path_capacity=16)
+        self.index = self.ledger.append_row(entry_day, entry_price, position)
+
+    @classmethod
+    def at(cls, ledger, index):
+        # Handle onto an existing row
+        trade = cls.__new__(cls)
+        trade.ledger = ledger
+        trade.index = index
+        return trade
+
+    def _value(self, name):
+        return self.ledger.columns[name][self.index].item()
+
+    @property
+    def asset(self):
+        return self.ledger.asset
+
+    @property
+    def entry_day(self):
+        return self._value("entry_day")
+
+    @property
+    def entry_price(self):
+        return self._value("entry_price")
+
+    @property
+    def position(self):
+        return self._value("position")
+
+    @property
+    def exit_day(self):
+        day = self._value("exit_day")
+        return day if day >= 0 else None
+
+    @property
+    def exit_price(self):
+        return self._value("exit_price") if self.exit_day is not None else None
+
+    @property
+    def realised_value(self):
+        return self._value("realised_value") if self.exit_day is not None else None
+
+    @property
+    def position_prices(self):
+        return self.ledger.price_path(self.index)
+
+    @property
+    def ev_history(self):
+        # Record of expected values while the trade is open
+        return self.ledger.ev_path(self.index)
+
+    @property
+    def cost_to_hold(self):
+        return abs(self.position_prices[-1].item() * self.position)
 
     def update(self, current_day, current_price, exit_condition):
-        """Update cost-to-hold, record the latest price, and save the current expected value."""
-        self.cost_to_hold = abs(current_price * self.position)
-        self.position_prices.append(current_price)
-        ev = self.calculate_expected_value(exit_condition)
-        self.ev_history.append(ev)
+        """Record the latest price (which sets the cost-to-hold) and save the current expected value."""
+        self.ledger.append_price(self.index, current_price)
+        self.ledger.append_ev(self.index, self.calculate_expected_value(exit_condition))
 
-    def close(self, exit_day, exit_price):
+    def close(self, exit_day, exit_price, events=NULL_SINK):
         """
-        Close the trade, compute the realised value, and print the EV history.
+        Close the trade, compute the realised value, and emit a TradeClosed event (with the EV history) to events.
         """
-        self.exit_day = exit_day
-        self.exit_price = exit_price
-        if self.position > 0:
+        position = self.position
+        if position > 0:
             # For long trades: profit if exit > entry
-            self.realised_value = (exit_price - self.entry_price) * self.position
+            realised_value = (exit_price - self.entry_price) * position
         else:
             # For short trades: profit if exit < entry
-            self.realised_value = (self.entry_price - exit_price) * abs(self.position)
-        # Print EV history and realised value upon closing the trade.
-        print(f"Trade for {self.asset} closed on day {exit_day} at price {exit_price}")
-        print(f"EV History: {self.ev_history}")
-        print(f"Realised Value: {self.realised_value}")
+            realised_value = (self.entry_price - exit_price) * abs(position)
+        columns = self.ledger.columns
+        columns["exit_day"][self.index] = exit_day
+        columns["exit_price"][self.index] = exit_price
+        columns["realised_value"][self.index] = realised_value
+        if events.enabled(INFO):
+            # A copy, as a view into the ledger is only valid until the ledger grows
+            events.emit(TradeClosed(exit_day, self.asset, exit_price, realised_value, self.ev_history.copy()))
 
     def calculate_expected_value(self, exit_condition):
         """
@@ -68,13 +255,14 @@ class Trade:
             exit_condition (float): The benchmark exit price for EV calculation.
 
         Returns:
-            dict: A summary of key trade metrics.
+            dict: A summary of key trade metrics (the price and EV paths are read-only views into the ledger).
         """
         ev = self.calculate_expected_value(exit_condition)
         eff = None
-        if len(self.position_prices) >= 2:
+        position_prices = self.position_prices
+        if len(position_prices) >= 2:
             # Efficiency can be defined in many ways; here we show a ratio relative to the last price.
-            eff = ev / self.position_prices[-1]
+            eff = ev / position_prices[-1].item()
         return {
             "asset": self.asset,
             "entry_day": self.entry_day,
@@ -85,7 +273,7 @@ class Trade:
             "cost_to_hold": self.cost_to_hold,
             "expected_value": ev,
             "realised_value": self.realised_value,
-            "position_prices": self.position_prices,
+            "position_prices": position_prices,
             "position_efficiency": eff,
             "ev_history": self.ev_history
         }
@@ -105,6 +293,8 @@ class UQDollarStrategy:
         self.trade_size = trade_size
         self.exit_condition = exit_condition
         self.active_trade = None
+        # Every trade, open and closed, shared with the algorithm as algo.trades["UQ Dollar"]
+        self.ledger = algo.trades.setdefault("UQ Dollar", TradeLedger("UQ Dollar"))
 
     def evaluate(self):
         """
@@ -113,9 +303,11 @@ class UQDollarStrategy:
         and open a new one.
 
         Returns:
-            dict: A performance summary of the current trade.
+            Trade: The current trade (see Trade.performance_summary for a summary of it).
         """
         asset = "UQ Dollar"
+        # The algorithm's sink (the engine's while it is being run)
+        events = getattr(self.algo, "events", NULL_SINK)
         current_price = self.algo.get_current_price(asset)
         # Determine the desired position based on current price relative to the exit condition.
         if current_price < self.exit_condition:
@@ -132,25 +324,25 @@ class UQDollarStrategy:
             self.active_trade.update(self.algo.day, current_price, self.exit_condition)
             # If the active trade's position is not what we desire, then close it.
             if desired_position != self.active_trade.position:
-                self.active_trade.close(self.algo.day, current_price)
-                print(f"Trade for {asset} closed on day {self.algo.day} at price {current_price}")
-                # Optionally store the closed trade for logging.
-                self.algo.trades.setdefault(asset, []).append(self.active_trade)
+                # (It stays in the ledger, as a closed trade.)
+                self.active_trade.close(self.algo.day, current_price, events)
                 # Open a new trade with the desired position.
-                self.active_trade = Trade(asset, self.algo.day, current_price, desired_position)
+                self.active_trade = self.ledger.open(self.algo.day, current_price, desired_position)
                 # Record initial EV immediately.
                 self.active_trade.update(self.algo.day, current_price, self.exit_condition)
-                print(f"Opened new trade for {asset} on day {self.algo.day} at price {current_price}")
+                if events.enabled(INFO):
+                    events.emit(TradeOpened(self.algo.day, asset, current_price, desired_position))
         else:
             # No active trade: open a new one and record the initial EV.
-            self.active_trade = Trade(asset, self.algo.day, current_price, desired_position)
+            self.active_trade = self.ledger.open(self.algo.day, current_price, desired_position)
             self.active_trade.update(self.algo.day, current_price, self.exit_condition)
-            print(f"Opened new trade for {asset} on day {self.algo.day} at price {current_price}")
+            if events.enabled(INFO):
+                events.emit(TradeOpened(self.algo.day, asset, current_price, desired_position))
 
-        # Calculate expected value and print trade type info.
-        ev = self.active_trade.calculate_expected_value(self.exit_condition)
-        trade_type = "Long" if self.active_trade.position > 0 else "Short"
-        if self.algo.day >= 2:
-            print(f"Day {self.algo.day} - {trade_type} Trade EV for {asset}: {ev} at price {current_price}")
+        # Report the expected value and trade type.
+        if self.algo.day >= 2 and events.enabled(DEBUG):
+            ev = self.active_trade.calculate_expected_value(self.exit_condition)
+            trade_type = "Long" if self.active_trade.position > 0 else "Short"
+            events.emit(TradeEV(self.algo.day, asset, trade_type, ev, current_price))
 
-        return self.active_trade.performance_summary(self.exit_condition)
+        return self.active_trade
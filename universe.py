@@ -0,0 +1,74 @@
+"""
+The set of tradable instruments, and the mapping between instrument names and array columns.
+
+Instead of dicts of lists keyed by instrument name, the engines keep their per-day state in preallocated
+(days x instruments) arrays. A Universe fixes the column order (the order the market data was loaded in)
+and converts between name-keyed dicts and rows. Position limits and the total daily budget are read from a
+JSON config file (universe.json next to this module by default):
+
+    {"totalDailyBudget": 500000, "positionLimits": {"Fun Drink": 10000, ...}}
+"""
+import json
+import os
+import numpy as np
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'universe.json')
+
+
+def load_universe_config(path=None):
+    """
+    Read a universe config file.
+
+    Parameters:
+        path (str): Config file. Defaults to universe.json next to this module.
+
+    Returns:
+        dict: With 'positionLimits' (instrument name -> int limit) and 'totalDailyBudget'.
+    """
+    with open(path or DEFAULT_CONFIG_PATH) as file:
+        config = json.load(file)
+    return {
+        'positionLimits': {instrument: int(limit) for instrument, limit in config['positionLimits'].items()},
+        'totalDailyBudget': config['totalDailyBudget'],
+    }
+
+
+def write_universe_config(path, positionLimits, totalDailyBudget):
+    with open(path, 'w') as file:
+        json.dump({'totalDailyBudget': totalDailyBudget, 'positionLimits': positionLimits}, file, indent=4)
+
+
+class Universe:
+    def __init__(self, instruments, positionLimits):
+        """
+        Parameters:
+            instruments (iterable): Instrument names, in column order.
+            positionLimits (dict): Instrument name -> position limit (every instrument needs one).
+        """
+        self.instruments = list(instruments)
+        self.index = {instrument: column for column, instrument in enumerate(self.instruments)}
+        self.positionLimits = {instrument: positionLimits[instrument] for instrument in self.instruments}
+        # Limits aligned with the columns
+        self.limits = np.array([self.positionLimits[instrument] for instrument in self.instruments], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.instruments)
+
+    def __contains__(self, instrument):
+        return instrument in self.index
+
+    def allocate(self, days, dtype=np.int64):
+        # Zeroed (days x instruments) state array
+        return np.zeros((days, len(self.instruments)), dtype=dtype)
+
+    def to_row(self, values, default=0):
+        # Name-keyed dict -> array in column order (missing instruments get `default`)
+        return np.array([values.get(instrument, default) for instrument in self.instruments])
+
+    def to_dict(self, row):
+        # Array in column order -> name-keyed dict of plain Python values
+        return dict(zip(self.instruments, row.tolist()))
+
+    def columns(self, matrix):
+        # Name-keyed views of each column of a (days x instruments) array
+        return {instrument: matrix[:, column] for column, instrument in enumerate(self.instruments)}
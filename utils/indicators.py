@@ -0,0 +1,131 @@
+"""
+Whole-series indicators over NumPy arrays, for charting and offline research.
+
+Every function takes a 1-D price series or a 2-D (instruments x days) array and works along the last axis,
+returning float arrays of the same shape. Days before an indicator has enough data are NaN (e.g. the first
+window - 1 days of an SMA). Rolling sums use cumulative sums, rolling deviations use strided window views
+(a chunk of days at a time, to bound memory), and the exponential averages are computed a block of days at
+a time in closed form, so there is no per-element Python loop.
+"""
+import numpy as np
+
+
+def _as_prices(prices) -> np.ndarray:
+    return np.asarray(prices, dtype=np.float64)
+
+
+def _rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    # Sum of each trailing window (NaN until the first full window), via cumulative sums.
+    # Values are shifted by each series' first value first, which keeps the cumulative sums small.
+    out = np.full(values.shape, np.nan)
+    days = values.shape[-1]
+    if window < 1 or days < window:
+        return out
+    offset = values[..., :1]
+    cumulative = np.cumsum(values - offset, axis=-1)
+    sums = cumulative[..., window - 1:].copy()
+    sums[..., 1:] -= cumulative[..., :days - window]
+    out[..., window - 1:] = sums + window * offset
+    return out
+
+
+def _rolling_std(values: np.ndarray, window: int, ddof: int, chunk_days: int = 65536) -> np.ndarray:
+    # Two-pass standard deviation of each trailing window over strided views (no E[x^2] - E[x]^2 cancellation)
+    out = np.full(values.shape, np.nan)
+    days = values.shape[-1]
+    if window < 1 or days < window:
+        return out
+    for first in range(0, days - window + 1, chunk_days):
+        last = min(first + chunk_days, days - window + 1)
+        windows = np.lib.stride_tricks.sliding_window_view(values[..., first:last + window - 1], window, axis=-1)
+        out[..., first + window - 1:last + window - 1] = windows.std(axis=-1, ddof=ddof)
+    return out
+
+
+def _ewm(values: np.ndarray, alpha: float, start: int, seed) -> np.ndarray:
+    """
+    y[start] = seed, then y[t] = (1 - alpha) * y[t - 1] + alpha * values[t] along the last axis (NaN before start).
+
+    Solved in closed form a block of days at a time:
+    y[t0 + j] = d^(j + 1) * y[t0 - 1] + alpha * d^j * cumsum(values[t0 + k] * d^(-k)), with d = 1 - alpha.
+    Blocks are kept short enough that d^(-k) cannot overflow.
+    """
+    out = np.full(values.shape, np.nan)
+    days = values.shape[-1]
+    if start >= days:
+        return out
+    out[..., start] = seed
+    decay = 1.0 - alpha
+    if decay == 0.0:
+        out[..., start + 1:] = values[..., start + 1:]
+        return out
+    block = int(min(1024, max(1, 300 / -np.log10(decay)))) if decay < 1.0 else 1024
+    steps = np.arange(block)
+    growth = decay ** -steps.astype(np.float64)
+    shrink = decay ** steps.astype(np.float64)
+    previous = out[..., start]
+    t0 = start + 1
+    while t0 < days:
+        size = min(block, days - t0)
+        chunk = values[..., t0:t0 + size]
+        weighted = np.cumsum(chunk * growth[:size], axis=-1)
+        out[..., t0:t0 + size] = (shrink[:size] * decay) * previous[..., None] + alpha * shrink[:size] * weighted
+        previous = out[..., t0 + size - 1]
+        t0 += size
+    return out
+
+
+def sma(prices, window: int) -> np.ndarray:
+    """Simple moving average over the trailing `window` days."""
+    return _rolling_sum(_as_prices(prices), window) / window
+
+
+def ema(prices, window: int) -> np.ndarray:
+    """EMA with alpha = 2 / (window + 1), seeded with the SMA of the first `window` days."""
+    prices = _as_prices(prices)
+    if prices.shape[-1] < window:
+        return np.full(prices.shape, np.nan)
+    seed = prices[..., :window].mean(axis=-1)
+    return _ewm(prices, 2 / (window + 1), window - 1, seed)
+
+
+def rsi(prices, window: int = 14) -> np.ndarray:
+    """Wilder RSI. The first value (at day `window`) uses simple averages of the first `window` changes."""
+    prices = _as_prices(prices)
+    out = np.full(prices.shape, np.nan)
+    if prices.shape[-1] <= window:
+        return out
+    changes = np.diff(prices, axis=-1)
+    gains = np.maximum(changes, 0)
+    losses = np.maximum(-changes, 0)
+    # Smoothed averages indexed by change, starting with the change ending on day `window`
+    avg_gain = _ewm(gains, 1 / window, window - 1, gains[..., :window].mean(axis=-1))
+    avg_loss = _ewm(losses, 1 / window, window - 1, losses[..., :window].mean(axis=-1))
+    avg_gain, avg_loss = avg_gain[..., window - 1:], avg_loss[..., window - 1:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = 100 - 100 / (1 + avg_gain / avg_loss)
+    out[..., window:] = np.where(avg_loss == 0, 100.0, values)
+    return out
+
+
+def macd(prices, short_window: int = 12, long_window: int = 26, signal_window: int = 9):
+    """
+    MACD line, signal line and histogram. The EMAs are seeded with the first price (pandas ewm(adjust=False)),
+    so all three are defined from the first day.
+    """
+    prices = _as_prices(prices)
+    if prices.shape[-1] == 0:
+        return prices.copy(), prices.copy(), prices.copy()
+    ema_short = _ewm(prices, 2 / (short_window + 1), 0, prices[..., 0])
+    ema_long = _ewm(prices, 2 / (long_window + 1), 0, prices[..., 0])
+    macd_line = ema_short - ema_long
+    signal_line = _ewm(macd_line, 2 / (signal_window + 1), 0, macd_line[..., 0])
+    return macd_line, signal_line, macd_line - signal_line
+
+
+def bollinger_bands(prices, window: int, num_std: float = 2, ddof: int = 0):
+    """Middle (SMA), upper and lower bands, `num_std` rolling standard deviations (with `ddof`) either side."""
+    prices = _as_prices(prices)
+    middle = sma(prices, window)
+    std = _rolling_std(prices, window, ddof)
+    return middle, middle + num_std * std, middle - num_std * std
@@ -1,7 +1,9 @@
 """
 Only made these myself as we cant use external libraries like stock-indicators or yfinance
 """
-import pandas as pd
+from collections import deque
+
+from utils import indicators
 
 
 def sma_indicator(stock_price_history, days) -> float:
@@ -109,11 +111,146 @@ def macd_indicator(prices: list[float],
     """
     Compute the MACD line, Signal line, and Histogram using exponential moving averages.
     """
-    # Using pandas for simplicity
-    price_series = pd.Series(prices)
-    ema_short = price_series.ewm(span=short_window, adjust=False).mean()
-    ema_long = price_series.ewm(span=long_window, adjust=False).mean()
-    macd_line = ema_short - ema_long
-    signal_line = macd_line.ewm(span=signal_window, adjust=False).mean()
-    histogram = macd_line - signal_line
-    return macd_line.tolist(), signal_line.tolist(), histogram.tolist()
\ No newline at end of file
+    macd_line, signal_line, histogram = indicators.macd(prices, short_window, long_window, signal_window)
+    return macd_line.tolist(), signal_line.tolist(), histogram.tolist()
+
+# Streaming versions of the indicators above. Each keeps its own window state so a new price is an O(1)
+# update, rather than rescanning a fresh slice of the history on every call. Their `value` matches the
+# batch function given the same price history (RollingEMA to within float rounding).
+
+
+class RollingSMA:
+    """Streaming sma_indicator (sums integer-truncated prices over the last `days`, like the batch version)."""
+
+    def __init__(self, days: int):
+        self.days = days
+        self.window = deque(maxlen=days)
+        self.total = 0
+
+    def update(self, price: float) -> float:
+        if self.days == 0:
+            return self.value
+        if len(self.window) == self.days:
+            self.total -= self.window[0]
+        self.window.append(int(price))
+        self.total += int(price)
+        return self.value
+
+    @property
+    def value(self) -> float:
+        if self.days == 0:
+            return 0
+        return self.total / self.days
+
+
+class RollingEMA:
+    """
+    Streaming ema_indicator: an EMA over only the last `window` prices, seeded with the oldest of them.
+
+    The value is kept as a running weighted sum, so an update is O(1) whatever the window. It agrees with the
+    batch version to within float rounding. The rounding error is damped by the decay on each update, so it
+    stays bounded: a relative error under about 1e-12, even after thousands of updates. A flat window of 3.32
+    may read 3.3200000000000003, so compare the value with a tolerance rather than for exact equality.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.alpha = 2 / (window + 1)
+        self.decay = 1 - self.alpha
+        self.prices = deque(maxlen=window)
+        # Weight of the oldest price in the window, and the weighted sum of all the others
+        self.oldest_weight = self.decay ** (window - 1)
+        self.tail = None
+
+    def update(self, price: float) -> float:
+        if self.tail is not None and self.window > 1:
+            # Slide the window: age the tail, drop the price leaving it (which becomes the oldest), add the new one
+            self.tail = self.decay * self.tail - self.alpha * self.oldest_weight * self.prices[1] + self.alpha * price
+            self.prices.append(price)
+        else:
+            self.prices.append(price)
+            if len(self.prices) == self.window:
+                self.tail = 0.0
+                for age, past_price in enumerate(reversed(self.prices)):
+                    if age < self.window - 1:
+                        self.tail += self.alpha * self.decay ** age * past_price
+        return self.value
+
+    @property
+    def value(self) -> float:
+        if self.tail is not None:
+            return self.oldest_weight * self.prices[0] + self.tail
+        # Still filling the window, so run the recurrence over what there is
+        prices = iter(self.prices)
+        ema = next(prices)
+        for price in prices:
+            ema = (price - ema) * self.alpha + ema
+        return ema
+
+
+class WilderRSI:
+    """Streaming rsi_series: Wilder-smoothed RSI, None until `window` price changes have been seen."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.previous_price = None
+        self.changes = 0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+        self.value = None
+
+    def update(self, price: float):
+        if self.previous_price is not None:
+            change = price - self.previous_price
+            gain = max(change, 0)
+            loss = max(-change, 0)
+            self.changes += 1
+            if self.changes <= self.window:
+                # Simple average over the first `window` changes
+                self.avg_gain += gain / self.window
+                self.avg_loss += loss / self.window
+                if self.changes == self.window:
+                    self._set_value()
+            else:
+                self.avg_gain = (self.avg_gain * (self.window - 1) + gain) / self.window
+                self.avg_loss = (self.avg_loss * (self.window - 1) + loss) / self.window
+                self._set_value()
+        self.previous_price = price
+        return self.value
+
+    def _set_value(self):
+        if self.avg_loss == 0:
+            self.value = 100
+        else:
+            rs = self.avg_gain / self.avg_loss
+            self.value = 100 - (100 / (1 + rs))
+
+
+class RollingBollinger:
+    """Streaming bollinger_bands from running sums of the (integer-truncated) prices in the window."""
+
+    def __init__(self, days: int, num_std=2):
+        self.days = days
+        self.num_std = num_std
+        self.window = deque(maxlen=days)
+        self.total = 0
+        self.total_sq = 0
+
+    def update(self, price: float) -> tuple[float, float, float]:
+        if len(self.window) == self.days:
+            dropped = self.window[0]
+            self.total -= dropped
+            self.total_sq -= dropped * dropped
+        price = int(price)
+        self.window.append(price)
+        self.total += price
+        self.total_sq += price * price
+        return self.value
+
+    @property
+    def value(self) -> tuple[float, float, float]:
+        middle_band = self.total / self.days
+        # sum((x - m)^2) over the window, from the running sums
+        sum_sq_diff = self.total_sq - 2 * middle_band * self.total + len(self.window) * middle_band ** 2
+        std_dev = (max(sum_sq_diff, 0) / self.days) ** 0.5
+        return middle_band, middle_band + self.num_std * std_dev, middle_band - self.num_std * std_dev
@@ -0,0 +1,113 @@
+"""
+Checks requested positions against the daily budget, the per-instrument limits and the whole-number rule.
+
+validate_positions checks a whole row of positions (one day), or a (days x instruments) matrix, with array
+operations and returns a ValidationReport. The report holds the positions that will actually be held and
+what was wrong, instead of printing as it goes. Days over budget have every position set to zero. Otherwise
+any position that is not a whole number, or is over its limit, is set to zero.
+"""
+import numpy as np
+
+
+class ValidationReport:
+    def __init__(self, requested, positions, totalValue, budget, overBudget, notInt, overLimit, invalid, ok,
+                 day=None):
+        """
+        Parameters:
+            requested (np.ndarray): Positions as requested (may be an object array if some are not ints).
+            positions (np.ndarray): int64 positions after validation.
+            totalValue (float or np.ndarray): Total absolute value of the requested positions (per day).
+            budget (float): The daily budget checked against.
+            overBudget (bool or np.ndarray): Whether the total value exceeded the budget (per day).
+            notInt (np.ndarray): Mask of requested positions that are not whole numbers.
+            overLimit (np.ndarray): Mask of (whole number) requested positions over their limit.
+            invalid (np.ndarray): Mask of positions zeroed for being invalid (not counting days where
+                everything was zeroed for the budget).
+            ok (bool): True if nothing was zeroed.
+            day (int): Day the row was requested on, for a single day's report.
+        """
+        self.requested = requested
+        self.positions = positions
+        self.totalValue = totalValue
+        self.budget = budget
+        self.overBudget = overBudget
+        self.notInt = notInt
+        self.overLimit = overLimit
+        self.invalid = invalid
+        self.day = day
+        self.ok = ok
+
+    @property
+    def budgetUsed(self):
+        # Value of the positions held against the budget (zero on days over budget)
+        return np.where(self.overBudget, 0, self.totalValue)
+
+    def summary(self, instruments, limits, maxListed=5):
+        """One line describing what was set to zero and why (empty if nothing was)."""
+        if self.ok:
+            return ""
+        prefix = f"Day {self.day}: " if self.day is not None else ""
+        if np.ndim(self.overBudget) == 0:
+            if self.overBudget:
+                return (f"{prefix}requested positions worth ${float(self.totalValue)} exceed the daily budget "
+                        f"of ${self.budget}, all positions set to zero.")
+            columns = np.flatnonzero(self.invalid).tolist()
+            details = []
+            for column in columns[:maxListed]:
+                reason = "not a whole number" if self.notInt[column] else f"limit {int(limits[column])}"
+                details.append(f"{instruments[column]} {self.requested[column]} ({reason})")
+            more = f" and {len(columns) - maxListed} more" if len(columns) > maxListed else ""
+            return f"{prefix}{len(columns)} invalid position(s) set to zero: {', '.join(details)}{more}."
+        return (f"{prefix}{int(np.sum(self.overBudget))} day(s) exceeded the daily budget of ${self.budget} "
+                f"and {int(self.invalid.sum())} position(s) were invalid. These were set to zero.")
+
+
+def validate_positions(requested, prices, limits, budget, notInt=None, day=None):
+    """
+    Validate a row (or days x instruments matrix) of requested positions in one pass.
+
+    Parameters:
+        requested (np.ndarray): Requested positions, columns aligned with prices and limits.
+        prices (np.ndarray): Prices the positions are valued at.
+        limits (np.ndarray): Position limit of each column.
+        budget (float): Total daily budget.
+        notInt (np.ndarray): Mask of requested positions that are not whole numbers (none if not given).
+        day (int): Day being validated, recorded on the report.
+
+    Returns:
+        ValidationReport
+    """
+    # Total value of each day's positions. A cumulative sum adds the columns one at a time, in order,
+    # so the total (and so the budget decision) is exactly what a running total over the instruments gives.
+    values = np.abs(requested * prices)
+    if values.ndim == 1:
+        # A single day, kept to plain Python scalars
+        totalValue = float(np.cumsum(values, dtype=np.float64)[-1]) if len(values) else 0.0
+        overBudget = totalValue > budget
+        anyOverBudget = overBudget
+    else:
+        totalValue = np.cumsum(values, axis=-1, dtype=np.float64)[..., -1] if values.shape[-1] \
+            else np.zeros(values.shape[:-1])
+        overBudget = totalValue > budget
+        anyOverBudget = overBudget.any()
+    if notInt is not None and notInt.any():
+        # Only whole numbers are compared with their limit
+        wholeNumbers = np.where(notInt, 0, requested)
+        overLimit = (np.abs(wholeNumbers) > limits) & ~notInt
+        invalid = notInt | overLimit
+    else:
+        notInt = np.zeros(np.shape(requested), dtype=bool)
+        wholeNumbers = requested
+        overLimit = invalid = np.abs(requested) > limits
+    ok = False
+    if anyOverBudget:
+        zeroedDays = np.asarray(overBudget)[..., None]
+        invalid = invalid & ~zeroedDays
+        positions = np.where(invalid | zeroedDays, 0, wholeNumbers).astype(np.int64)
+    elif invalid.any():
+        positions = np.where(invalid, 0, wholeNumbers).astype(np.int64)
+    else:
+        positions = np.asarray(requested, dtype=np.int64)
+        ok = True
+    return ValidationReport(requested, positions, totalValue, budget, overBudget, notInt, overLimit, invalid, ok,
+                            day=day)
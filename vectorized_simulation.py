@@ -0,0 +1,68 @@
+# Library Imports
+import numpy as np
+
+from simulation import TradingEngine
+from accounting import to_cents_array, cents_to_decimal
+from validation import validate_positions
+from events import DailyPnL, PositionsZeroed, DEBUG, WARNING
+
+
+# Vectorized Trading Engine, for strategies that can state every day's positions up front.
+# Gives the same results as TradingEngine.run_algorithms (to the cent), but does all of the
+# budget checks, limit checks and PnL bookkeeping with array operations instead of a per-day loop.
+class VectorizedTradingEngine(TradingEngine):
+    def __init__(self, dataFolder='./data/', data=None, universeConfig=None, events=None, days=None):
+        super().__init__(dataFolder=dataFolder, data=data, universeConfig=universeConfig, events=events, days=days)
+        # Column order of position matrices (same order the loop engine walks instruments in)
+        self.instruments = self.universe.instruments
+        # Position limits aligned with the matrix columns
+        self.limits = self.universe.limits
+
+    # Turn a dict of per-instrument position series into a (days x instruments) matrix
+    def position_matrix(self, positionSeries):
+        matrix = np.zeros((self.totalDays, len(self.instruments)), dtype=np.int64)
+        for column, instrument in enumerate(self.instruments):
+            if instrument in positionSeries:
+                matrix[:, column] = positionSeries[instrument]
+        return matrix
+
+    # Process a full matrix of desired positions (days x instruments, columns in self.instruments order)
+    def run_positions(self, desiredPositions, output_daily_to_CLI=False):
+        if isinstance(desiredPositions, dict):
+            desiredPositions = self.position_matrix(desiredPositions)
+        desiredPositions = np.asarray(desiredPositions)
+        if desiredPositions.shape != self.priceMatrix.shape:
+            raise ValueError(f"Expected a {self.priceMatrix.shape} position matrix, got {desiredPositions.shape}.")
+        if not np.issubdtype(desiredPositions.dtype, np.integer):
+            raise TypeError("Positions must be whole numbers of units (integer dtype).")
+        desiredPositions = desiredPositions.astype(np.int64)
+
+        # Budget, limit checks for every day at once. Days over budget have every position zeroed,
+        # then anything over its limit is zeroed
+        report = validate_positions(desiredPositions, self.priceMatrix, self.limits, self.totalDailyBudget)
+        self.allocate_state()
+        self.budgetUsedArray[:] = report.budgetUsed
+        positions = report.positions
+        self.positionMatrix[:] = positions
+        if not report.ok:
+            self.validationReports.append(report)
+            if self.events.enabled(WARNING):
+                self.events.emit(PositionsZeroed(report, self.instruments, self.limits))
+
+        # Yesterday's position earns today's price change, rounded to the cent. Nothing is held on day 0.
+        # Fills the same state arrays as TradingEngine, so reporting and plotting work as is
+        self.returnsCentsMatrix[1:] = to_cents_array(positions[:-1] * (self.priceMatrix[1:] - self.priceMatrix[:-1]))
+        np.cumsum(self.returnsCentsMatrix, axis=0, out=self.cumulativeReturnsCentsMatrix)
+        self.pcPositionMatrix[:] = np.rint(positions * 100 / self.limits)
+        self.totalReturnCentsArray[:] = self.returnsCentsMatrix.sum(axis=1)
+        np.cumsum(self.totalReturnCentsArray, out=self.totalValueCentsArray)
+        self.daysRun = self.totalDays
+        self.positions = self.universe.to_dict(positions[-1])
+        self.totalPNLCents = int(self.totalValueCentsArray[-1])
+
+        if self.events.enabled(DEBUG):
+            for day, value in enumerate(self.totalValueCents.tolist()):
+                self.events.emit(DailyPnL(day, value))
+        if output_daily_to_CLI:
+            for day, value in enumerate(self.totalValueCents):
+                print(f"Total PNL @ Day {day}: {cents_to_decimal(value)}")
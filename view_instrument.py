@@ -3,6 +3,8 @@ import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Cursor
 
+from utils.indicators import sma, ema, rsi, macd, bollinger_bands
+
 
 class ChartView:
     def __init__(self, price_data: list[float]):
@@ -104,88 +106,6 @@ class ChartView:
         plt.show()
 
 
-def sma_indicator(prices: list[float], window: int) -> list[float]:
-    # Pre-fill the initial values with None where we don't have enough data to calculate the SMA.
-    sma_list = [None] * (window - 1)
-    for i in range(window - 1, len(prices)):
-        window_prices = prices[i - window + 1:i + 1]
-        sma_list.append(sum(window_prices) / window)
-    return sma_list
-
-
-def ema_indicator(prices: list[float], window: int) -> list[float]:
-    ema_list = [None] * (window - 1)
-    alpha = 2 / (window + 1)
-    initial_sma = sum(prices[:window]) / window
-    ema_list.append(initial_sma)
-    ema_prev = initial_sma
-    for price in prices[window:]:
-        ema_current = (price - ema_prev) * alpha + ema_prev
-        ema_list.append(ema_current)
-        ema_prev = ema_current
-    return ema_list
-
-
-def rsi_indicator(prices: list[float], window: int) -> list[float]:
-    rsi_list = [None] * window
-    gains = []
-    losses = []
-    for i in range(1, window + 1):
-        change = prices[i] - prices[i - 1]
-        gains.append(max(change, 0))
-        losses.append(max(-change, 0))
-    avg_gain = sum(gains) / window
-    avg_loss = sum(losses) / window
-    if avg_loss == 0:
-        rsi = 100
-    else:
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
-    rsi_list.append(rsi)
-    for i in range(window + 1, len(prices)):
-        change = prices[i] - prices[i - 1]
-        gain = max(change, 0)
-        loss = max(-change, 0)
-        avg_gain = (avg_gain * (window - 1) + gain) / window
-        avg_loss = (avg_loss * (window - 1) + loss) / window
-        if avg_loss == 0:
-            rsi = 100
-        else:
-            rs = avg_gain / avg_loss
-            rsi = 100 - (100 / (1 + rs))
-        rsi_list.append(rsi)
-    return rsi_list
-
-
-def macd_indicator(prices: list[float],
-                   short_window: int = 12,
-                   long_window: int = 26,
-                   signal_window: int = 9) -> tuple[list[float], list[float], list[float]]:
-    """
-    Compute the MACD line, Signal line, and Histogram using exponential moving averages.
-    """
-    # Using pandas for simplicity
-    price_series = pd.Series(prices)
-    ema_short = price_series.ewm(span=short_window, adjust=False).mean()
-    ema_long = price_series.ewm(span=long_window, adjust=False).mean()
-    macd_line = ema_short - ema_long
-    signal_line = macd_line.ewm(span=signal_window, adjust=False).mean()
-    histogram = macd_line - signal_line
-    return macd_line.tolist(), signal_line.tolist(), histogram.tolist()
-
-
-def bollinger_bands(prices: list[float],
-                    window: int,
-                    num_std: float = 2
-                    ) -> tuple[list[float], list[float], list[float]]:
-    price_series = pd.Series(prices)
-    sma = price_series.rolling(window).mean()
-    std = price_series.rolling(window).std()
-    upper_band = sma + num_std * std
-    lower_band = sma - num_std * std
-    return sma.tolist(), upper_band.tolist(), lower_band.tolist()
-
-
 def main():
     """
     - Main plot is for looking at price history and indicators that are important relevant to the price.
@@ -197,28 +117,28 @@ def main():
     # Read price history to a dataframe
     df = pd.read_csv("data/seen_data/Fintech Token_price_history.csv")
 
-    # Convert the prices to a list
-    prices = df["Price"].tolist()
+    # Convert the prices to an array
+    prices = df["Price"].to_numpy(dtype=float)
 
-    # Calculate any indicators we may want to view/use
-    sma = sma_indicator(prices, 28)
-    ema = ema_indicator(prices, 7)
-    rsi = rsi_indicator(prices, 14)
-    macd_line, macd_signal, macd_hist = macd_indicator(prices)
-    bb_middle, bb_upper, bb_lower = bollinger_bands(prices, window=14, num_std=1)
+    # Calculate any indicators we may want to view/use (NaN until each has enough data)
+    sma_28 = sma(prices, 28)
+    ema_7 = ema(prices, 7)
+    rsi_14 = rsi(prices, 14)
+    macd_line, macd_signal, macd_hist = macd(prices)
+    bb_middle, bb_upper, bb_lower = bollinger_bands(prices, window=14, num_std=1, ddof=1)
 
     # Create a chart with the price data
     chart = ChartView(prices)
 
     # Add indicators to the main plot
     chart.add_data_series("Price", prices, {"color": "black"}, plot="main")
-    chart.add_data_series("EMA (3 Days)", ema, {"color": "red"}, plot="main")
+    chart.add_data_series("EMA (3 Days)", ema_7, {"color": "red"}, plot="main")
     # chart.add_data_series("Bollinger Upper (20 Days)", bb_upper, {"color": "red"}, plot="main")
     # chart.add_data_series("Bollinger Lower (20 Days)", bb_lower, {"color": "green"}, plot="main")
     # chart.add_data_series("Bollinger Middle (20 Days)", bb_middle, {"color": "blue"}, plot="main")
 
     # Add indicators to the relative plot
-    # chart.add_data_series("RSI", rsi, {"color": "blue"}, plot="relative")
+    # chart.add_data_series("RSI", rsi_14, {"color": "blue"}, plot="relative")
     chart.add_data_series("MACD Line", macd_line, {"color": "orange"}, plot="relative")
     chart.add_data_series("MACD Signal", macd_signal, {"color": "magenta"}, plot="relative")
     chart.add_data_series("MACD Histogram", macd_hist, {"color": "grey"}, plot="relative")